@@ -0,0 +1,200 @@
+"""
+Admission control and load shedding for the API endpoints
+
+Each endpoint gets a concurrency limit and a bounded wait queue. Requests
+that cannot start before their deadline are rejected immediately with a
+retry hint instead of queueing until they time out, and once the queue gets
+deep admitted requests are flagged as degraded so the handler can skip slow
+upstream calls (e.g. serve cached or demo weather).
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+
+# Default limits per endpoint, overridable with ADMISSION_<ENDPOINT>_<SETTING>
+ENDPOINT_LIMITS = {
+    'predict': {'max_concurrent': 16, 'max_queue': 64, 'timeout': 10.0, 'degrade_queue_depth': 16},
+    'report': {'max_concurrent': 2, 'max_queue': 8, 'timeout': 30.0, 'degrade_queue_depth': None}
+}
+
+# Header a client can send to tighten the deadline (seconds)
+TIMEOUT_HEADER = 'X-Request-Timeout'
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed by admission control"""
+
+    def __init__(self, endpoint, retry_after):
+        super().__init__(f"Server busy ({endpoint}), retry in {retry_after}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """Handed to an admitted request"""
+
+    def __init__(self, degraded):
+        self.degraded = degraded
+
+
+def limits_for(endpoint):
+    """Return the configured limits for an endpoint, applying env overrides"""
+    limits = dict(ENDPOINT_LIMITS[endpoint])
+    for setting, default in limits.items():
+        value = os.getenv(f"ADMISSION_{endpoint.upper()}_{setting.upper()}")
+        if value is not None:
+            limits[setting] = float(value) if setting == 'timeout' else int(value)
+    return limits
+
+
+class BaseAdmissionController:
+    """Bookkeeping shared by the threaded and asyncio controllers"""
+
+    def __init__(self, name, max_concurrent, max_queue, timeout, degrade_queue_depth=None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.degrade_queue_depth = degrade_queue_depth
+
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.degraded_requests = 0
+        self.avg_service_time = 0.0
+
+    @classmethod
+    def for_endpoint(cls, endpoint):
+        return cls(endpoint, **limits_for(endpoint))
+
+    def deadline(self, requested_timeout=None):
+        """Absolute deadline for a request arriving now"""
+        timeout = self.timeout
+        if requested_timeout:
+            try:
+                timeout = min(timeout, float(requested_timeout))
+            except ValueError:
+                pass
+        return time.monotonic() + timeout
+
+    def estimated_wait(self):
+        """Expected queueing delay for a request arriving now"""
+        if self.in_flight < self.max_concurrent:
+            return 0.0
+        return (self.queued + 1) * self.avg_service_time / self.max_concurrent
+
+    def retry_after(self):
+        return max(1, math.ceil(self.estimated_wait()))
+
+    def _reject(self):
+        self.rejected += 1
+        raise Overloaded(self.name, self.retry_after())
+
+    def _check_admission(self, deadline):
+        """Shed the request now if it cannot be queued or cannot start in time"""
+        if self.queued >= self.max_queue and self.in_flight >= self.max_concurrent:
+            self._reject()
+        if time.monotonic() + self.estimated_wait() > deadline:
+            self._reject()
+
+    def _should_degrade(self):
+        return self.degrade_queue_depth is not None and self.queued >= self.degrade_queue_depth
+
+    def _record_service(self, seconds):
+        # Exponentially weighted moving average of the service time
+        if self.avg_service_time == 0:
+            self.avg_service_time = seconds
+        else:
+            self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * seconds
+
+    def stats(self):
+        return {
+            'endpoint': self.name,
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'degraded': self.degraded_requests,
+            'avg_service_time': self.avg_service_time
+        }
+
+
+class AdmissionController(BaseAdmissionController):
+    """Admission control for threaded servers (Flask / WSGI)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+
+    @contextmanager
+    def admit(self, deadline=None):
+        if deadline is None:
+            deadline = self.deadline()
+
+        with self._lock:
+            self._check_admission(deadline)
+            degraded = self._should_degrade()
+            self.queued += 1
+
+        acquired = self._slots.acquire(timeout=max(0, deadline - time.monotonic()))
+
+        with self._lock:
+            self.queued -= 1
+            if not acquired:
+                self._reject()
+            self.in_flight += 1
+            self.admitted += 1
+            if degraded:
+                self.degraded_requests += 1
+
+        start = time.monotonic()
+        try:
+            yield AdmissionTicket(degraded)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self._record_service(time.monotonic() - start)
+            self._slots.release()
+
+
+class AsyncAdmissionController(BaseAdmissionController):
+    """Admission control for asyncio servers (ASGI)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+
+    @asynccontextmanager
+    async def admit(self, deadline=None):
+        if deadline is None:
+            deadline = self.deadline()
+
+        self._check_admission(deadline)
+        degraded = self._should_degrade()
+        self.queued += 1
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=max(0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self._reject()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        if degraded:
+            self.degraded_requests += 1
+
+        start = time.monotonic()
+        try:
+            yield AdmissionTicket(degraded)
+        finally:
+            self.in_flight -= 1
+            self._record_service(time.monotonic() - start)
+            self._slots.release()
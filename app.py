@@ -1,5 +1,6 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, g, Response
 from flask_cors import CORS
+from functools import wraps
 import pandas as pd
 import numpy as np
 import joblib
@@ -11,14 +12,51 @@ import pytz
 from solar_prediction import SolarPowerPredictor
 from weather_api import WeatherDataProvider
 from report_generator import ReportGenerator
+from admission import AdmissionController, Overloaded, TIMEOUT_HEADER
+from response_format import requested_format, encode_response
+from prediction_history import PredictionHistory
+from model_registry import ModelRegistry
+from http_cache import weather_cache_headers, prediction_cache_headers, not_modified
 
 app = Flask(__name__)
 CORS(app)
 
+# Geocoding service (overridable to point at a mirror or a local stub)
+NOMINATIM_DOMAIN = os.getenv('NOMINATIM_DOMAIN', 'nominatim.openstreetmap.org')
+NOMINATIM_SCHEME = os.getenv('NOMINATIM_SCHEME', 'https')
+
+# Route predictions to per-region models instead of the single global one
+REGIONAL_MODELS = os.getenv('REGIONAL_MODELS', '0') == '1'
+
 # Initialize components
 solar_predictor = SolarPowerPredictor()
+model_registry = ModelRegistry() if REGIONAL_MODELS else None
 weather_provider = WeatherDataProvider()
 report_generator = ReportGenerator()
+prediction_history = PredictionHistory()
+
+# Per-endpoint concurrency limits and bounded queues
+predict_admission = AdmissionController.for_endpoint('predict')
+report_admission = AdmissionController.for_endpoint('report')
+
+def admission_controlled(controller):
+    """Run a view under an admission controller; g.degraded flags a deep queue"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            deadline = controller.deadline(request.headers.get(TIMEOUT_HEADER))
+            with controller.admit(deadline) as ticket:
+                g.degraded = ticket.degraded
+                return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@app.errorhandler(Overloaded)
+def handle_overloaded(e):
+    response = jsonify({'success': False, 'error': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
 
 @app.route('/')
 def landing():
@@ -32,35 +70,72 @@ def predict():
 def analytics():
     return render_template('analytics.html')
 
-@app.route('/api/predict', methods=['POST'])
-def predict_solar_power():
-    try:
-        data = request.json
+def validate_prediction_request(data):
+    """Return an error message for an invalid prediction request, or None"""
+    if not data:
+        return 'No data provided'
+    
+    location = data.get('location', {})
+    panel_config = data.get('panel_config', {})
+    
+    # Validate location data
+    if not location.get('latitude') or not location.get('longitude'):
+        return 'Latitude and longitude are required'
         
-        # Validate required parameters
-        if not data:
-            return jsonify({'success': False, 'error': 'No data provided'}), 400
-            
-        location = data.get('location', {})
-        panel_config = data.get('panel_config', {})
-        prediction_type = data.get('prediction_type', 'daily')
-        
-        # Validate location data
-        if not location.get('latitude') or not location.get('longitude'):
-            return jsonify({'success': False, 'error': 'Latitude and longitude are required'}), 400
-            
-        # Validate panel config
-        if not panel_config.get('area') or panel_config['area'] <= 0:
-            return jsonify({'success': False, 'error': 'Valid panel area is required'}), 400
-            
-        # Get weather data
-        weather_data = weather_provider.get_weather_data(
-            location['latitude'], 
-            location['longitude']
+    # Validate panel config
+    if not panel_config.get('area') or panel_config['area'] <= 0:
+        return 'Valid panel area is required'
+    
+    return None
+
+def predictor_for(location):
+    """Model serving a location: its regional model when enabled, else the global one"""
+    if model_registry is not None:
+        return model_registry.predictor_for(location['latitude'])
+    return solar_predictor
+
+def run_prediction(data, weather_data=None, hourly_forecast=None, predictor=None):
+    """Run the current and optimal-configuration predictions for a request.
+    
+    Weather is fetched by the caller (blocking in the Flask app, as coroutines
+    in the ASGI server): ``hourly_forecast`` for the 'forecast' prediction
+    type, ``weather_data`` otherwise. ``predictor`` is the model already
+    resolved for the request, if any; the result carries its version.
+    """
+    location = data['location']
+    panel_config = data['panel_config']
+    prediction_type = data.get('prediction_type', 'daily')
+    predictor = predictor or predictor_for(location)
+    
+    # Get optimal configuration
+    optimal_config = predictor.get_optimal_configuration(
+        location['latitude'], 
+        location['longitude'],
+        panel_config['area']
+    )
+    
+    if prediction_type == 'forecast':
+        # Hourly prediction over the full 5-day weather forecast
+        prediction = predictor.predict_forecast(
+            latitude=location['latitude'],
+            longitude=location['longitude'],
+            panel_area=panel_config['area'],
+            tilt_angle=panel_config.get('tilt', 30),
+            azimuth_angle=panel_config.get('azimuth', 180),
+            hourly_forecast=hourly_forecast
         )
         
+        optimal_prediction = predictor.predict_forecast(
+            latitude=location['latitude'],
+            longitude=location['longitude'],
+            panel_area=panel_config['area'],
+            tilt_angle=optimal_config['tilt'],
+            azimuth_angle=optimal_config['azimuth'],
+            hourly_forecast=hourly_forecast
+        )
+    else:
         # Prepare features for ML model
-        features = solar_predictor.prepare_features(
+        features = predictor.prepare_features(
             latitude=location['latitude'],
             longitude=location['longitude'],
             panel_area=panel_config['area'],
@@ -70,17 +145,10 @@ def predict_solar_power():
         )
         
         # Make prediction
-        prediction = solar_predictor.predict(features, prediction_type)
-        
-        # Get optimal configuration
-        optimal_config = solar_predictor.get_optimal_configuration(
-            location['latitude'], 
-            location['longitude'],
-            panel_config['area']
-        )
+        prediction = predictor.predict(features, prediction_type)
         
         # Calculate optimal prediction
-        optimal_features = solar_predictor.prepare_features(
+        optimal_features = predictor.prepare_features(
             latitude=location['latitude'],
             longitude=location['longitude'],
             panel_area=panel_config['area'],
@@ -89,37 +157,140 @@ def predict_solar_power():
             weather_data=weather_data
         )
         
-        optimal_prediction = solar_predictor.predict(optimal_features, prediction_type)
+        optimal_prediction = predictor.predict(optimal_features, prediction_type)
+    
+    # Calculate improvement percentage safely
+    improvement = 0
+    if prediction['total_power'] > 0:
+        improvement = ((optimal_prediction['total_power'] - prediction['total_power']) / prediction['total_power'] * 100)
+    
+    return {
+        'success': True,
+        'prediction': prediction,
+        'optimal_config': optimal_config,
+        'optimal_prediction': optimal_prediction,
+        'improvement_percentage': improvement,
+        'model_version': predictor.model_version
+    }
+
+def build_report(data):
+    """Generate the requested report and return its path"""
+    report_type = data.get('type', 'csv')  # csv, pdf, parquet, arrow or xlsx
+    prediction_data = data.get('prediction_data')
+    
+    if report_type == 'csv':
+        return report_generator.generate_csv_report(prediction_data)
+    if report_type == 'parquet':
+        return report_generator.generate_parquet_report(prediction_data)
+    if report_type == 'arrow':
+        return report_generator.generate_arrow_report(prediction_data)
+    if report_type == 'xlsx':
+        return report_generator.generate_excel_report(prediction_data)
+    if data.get('sites'):
+        # Fleet report: {site name: prediction data}
+        return report_generator.generate_multi_site_pdf_report(data['sites'])
+    return report_generator.generate_pdf_report(prediction_data)
+
+@app.route('/api/predict', methods=['POST'])
+@admission_controlled(predict_admission)
+def predict_solar_power():
+    try:
+        data = request.json
+        
+        # Validate required parameters
+        error = validate_prediction_request(data)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
         
-        # Calculate improvement percentage safely
-        improvement = 0
-        if prediction['total_power'] > 0:
-            improvement = ((optimal_prediction['total_power'] - prediction['total_power']) / prediction['total_power'] * 100)
+        location = data['location']
+        weather_data = None
+        hourly_forecast = None
         
-        return jsonify({
-            'success': True,
-            'prediction': prediction,
-            'optimal_config': optimal_config,
-            'optimal_prediction': optimal_prediction,
-            'improvement_percentage': improvement
-        })
+        if data.get('prediction_type', 'daily') == 'forecast':
+            if g.degraded:
+                hourly_forecast = weather_provider.get_degraded_hourly_forecast(location['latitude'], location['longitude'])
+            else:
+                hourly_forecast = weather_provider.get_hourly_forecast(
+                    location['latitude'],
+                    location['longitude']
+                )
+        elif g.degraded:
+            # Overloaded: skip the upstream weather calls
+            weather_data = weather_provider.get_degraded_weather_data(
+                location['latitude'],
+                location['longitude']
+            )
+        else:
+            # Get weather data
+            weather_data = weather_provider.get_weather_data(
+                location['latitude'], 
+                location['longitude']
+            )
+        
+        # Opt-in compact encoding of the prediction series
+        fmt = requested_format(request.args, request.headers)
+        
+        # Validators from the weather snapshot and model; a match skips inference
+        predictor = predictor_for(location)
+        cache = None
+        if weather_data is not None and not g.degraded:
+            cache = prediction_cache_headers(weather_provider, data, weather_data, predictor.model_version, fmt)
+            if cache and not_modified(request.headers, cache):
+                return Response(status=304, headers=cache)
+        
+        result = run_prediction(data, weather_data, hourly_forecast, predictor)
+        result['degraded'] = g.degraded
+        prediction_history.record(data, result, result['model_version'])
+        
+        if fmt:
+            body, headers = encode_response(result, fmt, request.headers.get('Accept-Encoding'))
+            headers.update(cache or {})
+            return Response(body, mimetype='application/json', headers=headers)
+        
+        response = jsonify(result)
+        response.headers.update(cache or {})
+        return response
         
     except Exception as e:
         print(f"Prediction error: {str(e)}")  # Log the error for debugging
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/history')
+def get_history():
+    try:
+        rollups = prediction_history.rollups(
+            period=request.args.get('period', 'daily'),
+            site=request.args.get('site'),
+            model_version=request.args.get('model_version'),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            prediction_type=request.args.get('prediction_type', 'daily')
+        )
+        return jsonify({'success': True, 'data': rollups})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/weather/<lat>/<lon>')
 def get_weather(lat, lon):
     try:
         weather_data = weather_provider.get_weather_data(float(lat), float(lon))
-        return jsonify({'success': True, 'data': weather_data})
+        
+        cache = weather_cache_headers(weather_provider, float(lat), float(lon), weather_data)
+        if cache and not_modified(request.headers, cache):
+            return Response(status=304, headers=cache)
+        
+        response = jsonify({'success': True, 'data': weather_data})
+        response.headers.update(cache or {})
+        return response
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/geocode/<location>')
 def geocode_location(location):
     try:
-        geolocator = Nominatim(user_agent="solar_predictor")
+        geolocator = Nominatim(user_agent="solar_predictor", domain=NOMINATIM_DOMAIN, scheme=NOMINATIM_SCHEME)
         location_data = geolocator.geocode(location)
         
         if location_data:
@@ -135,16 +306,10 @@ def geocode_location(location):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/report', methods=['POST'])
+@admission_controlled(report_admission)
 def generate_report():
     try:
-        data = request.json
-        report_type = data.get('type', 'csv')  # csv or pdf
-        prediction_data = data.get('prediction_data')
-        
-        if report_type == 'csv':
-            report_path = report_generator.generate_csv_report(prediction_data)
-        else:
-            report_path = report_generator.generate_pdf_report(prediction_data)
+        report_path = build_report(request.json)
         
         return jsonify({
             'success': True,
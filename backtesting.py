@@ -0,0 +1,210 @@
+"""
+Backtesting of measured versus predicted solar power generation
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+# Cloud cover bands (%) used to break down the error metrics
+CLOUD_BAND_EDGES = [20, 40, 60, 80]
+CLOUD_BAND_LABELS = ['0-20%', '20-40%', '40-60%', '60-80%', '80-100%']
+
+MEASURED_COLUMN = 'measured_power'
+
+
+class GroupedErrors:
+    """Running error sums for one grouping key, reduced with np.bincount"""
+
+    def __init__(self, size=0):
+        self.count = np.zeros(size)
+        self.sum_error = np.zeros(size)
+        self.sum_abs_error = np.zeros(size)
+        self.sum_sq_error = np.zeros(size)
+
+    def _grow(self, size):
+        if size <= len(self.count):
+            return
+        for name in ('count', 'sum_error', 'sum_abs_error', 'sum_sq_error'):
+            values = getattr(self, name)
+            setattr(self, name, np.concatenate([values, np.zeros(size - len(values))]))
+
+    def add(self, codes, error, size):
+        """Accumulate the errors of one chunk into their groups"""
+        self._grow(size)
+        self.count[:size] += np.bincount(codes, minlength=size)
+        self.sum_error[:size] += np.bincount(codes, weights=error, minlength=size)
+        self.sum_abs_error[:size] += np.bincount(codes, weights=np.abs(error), minlength=size)
+        self.sum_sq_error[:size] += np.bincount(codes, weights=error * error, minlength=size)
+
+    def summary(self, labels, name):
+        """Return MAE, RMSE and bias per group as a DataFrame"""
+        size = len(labels)
+        count = self.count[:size]
+        seen = count > 0
+        safe_count = np.where(seen, count, 1)
+
+        df = pd.DataFrame({
+            name: labels,
+            'count': count.astype(np.int64),
+            'mae': self.sum_abs_error[:size] / safe_count,
+            'rmse': np.sqrt(self.sum_sq_error[:size] / safe_count),
+            'bias': self.sum_error[:size] / safe_count
+        })
+        return df[seen].reset_index(drop=True)
+
+
+class Backtester:
+    """Score historical site-hour measurements through the model in chunks.
+
+    Input rows carry ``site_id``, ``timestamp``, the site and weather columns
+    used by the model and a ``measured_power`` target. Only the running error
+    sums are kept between chunks, so memory stays bounded by ``chunk_size``.
+
+    Timestamps are UTC by default (naive ones are assumed UTC, aware ones are
+    converted) and shifted to local solar time by longitude / 15 hours, as
+    weather forecasts are; with ``utc=False`` they are taken as local solar
+    time already. Hour and month breakdowns use local solar time.
+    """
+
+    def __init__(self, predictor, chunk_size=500000, utc=True):
+        self.predictor = predictor
+        self.chunk_size = chunk_size
+        self.utc = utc
+        self.reset()
+
+    def reset(self):
+        """Clear the accumulated metrics"""
+        self.site_index = {}
+        self.overall = GroupedErrors(1)
+        self.by_site = GroupedErrors()
+        self.by_hour = GroupedErrors(24)
+        self.by_month = GroupedErrors(12)
+        self.by_cloud_band = GroupedErrors(len(CLOUD_BAND_LABELS))
+        self.rows = 0
+        self.inference_seconds = 0.0
+        self.elapsed_seconds = 0.0
+
+    def iter_chunks(self, source):
+        """Yield DataFrame chunks from a CSV path, a DataFrame or an iterable of DataFrames"""
+        if isinstance(source, str):
+            yield from pd.read_csv(source, chunksize=self.chunk_size)
+        elif isinstance(source, pd.DataFrame):
+            for start in range(0, len(source), self.chunk_size):
+                yield source.iloc[start:start + self.chunk_size]
+        else:
+            yield from source
+
+    def solar_times(self, chunk):
+        """Local solar time of each measurement in a chunk"""
+        if not self.utc:
+            return pd.to_datetime(chunk['timestamp']).reset_index(drop=True)
+
+        utc = pd.to_datetime(chunk['timestamp'], utc=True).dt.tz_localize(None).reset_index(drop=True)
+        return utc + pd.to_timedelta(chunk['longitude'].to_numpy(dtype=float) / 15, unit='h')
+
+    def prepare_features(self, chunk, solar_time):
+        """Build the model feature matrix for a chunk of measurements at local solar times"""
+        features = pd.DataFrame({
+            'latitude': chunk['latitude'].to_numpy(dtype=float),
+            'longitude': chunk['longitude'].to_numpy(dtype=float),
+            'panel_area': chunk['panel_area'].to_numpy(dtype=float),
+            'tilt_angle': chunk['tilt_angle'].to_numpy(dtype=float),
+            'azimuth_angle': chunk['azimuth_angle'].to_numpy(dtype=float),
+            'solar_irradiance': chunk['solar_irradiance'].to_numpy(dtype=float),
+            'temperature': chunk.get('temperature', 25),
+            'humidity': chunk.get('humidity', 50),
+            'wind_speed': chunk.get('wind_speed', 5),
+            'cloud_cover': chunk.get('cloud_cover', 0),
+            'day_of_year': solar_time.dt.dayofyear.to_numpy(),
+            'hour_of_day': solar_time.dt.hour.to_numpy()
+        })
+
+        features['sun_elevation'], features['sun_azimuth'] = self.predictor.calculate_sun_positions(
+            features['latitude'].to_numpy(),
+            features['day_of_year'].to_numpy(),
+            ((solar_time - solar_time.dt.normalize()) / pd.Timedelta(hours=1)).to_numpy()
+        )
+        return features
+
+    def site_codes(self, site_ids):
+        """Map the site ids of a chunk onto stable integer codes"""
+        codes, uniques = pd.factorize(site_ids)
+        mapping = np.array([self.site_index.setdefault(u, len(self.site_index)) for u in uniques], dtype=np.int64)
+        return mapping[codes]
+
+    def score_chunk(self, chunk):
+        """Predict one chunk and fold its errors into the grouped metrics"""
+        solar_time = self.solar_times(chunk)
+        features = self.prepare_features(chunk.reset_index(drop=True), solar_time)
+
+        start = time.perf_counter()
+        predicted = self.predictor.predict_batch(features)
+        self.inference_seconds += time.perf_counter() - start
+
+        error = predicted - chunk[MEASURED_COLUMN].to_numpy(dtype=float)
+        cloud_band = np.digitize(features['cloud_cover'].to_numpy(), CLOUD_BAND_EDGES)
+
+        self.overall.add(np.zeros(len(error), dtype=np.int64), error, 1)
+        self.by_site.add(self.site_codes(chunk['site_id'].to_numpy()), error, len(self.site_index))
+        self.by_hour.add(features['hour_of_day'].to_numpy(), error, 24)
+        self.by_month.add(solar_time.dt.month.to_numpy() - 1, error, 12)
+        self.by_cloud_band.add(cloud_band, error, len(CLOUD_BAND_LABELS))
+        self.rows += len(error)
+
+    def run(self, source):
+        """Backtest every chunk of ``source`` and return the error breakdowns"""
+        self.reset()
+        start = time.perf_counter()
+
+        for chunk in self.iter_chunks(source):
+            if len(chunk) > 0:
+                self.score_chunk(chunk)
+
+        self.elapsed_seconds = time.perf_counter() - start
+        return self.results()
+
+    def results(self):
+        """Summarise the accumulated metrics"""
+        overall = self.overall.summary(['all'], 'scope').to_dict('records')
+        site_labels = list(self.site_index.keys())
+
+        return {
+            'overall': overall[0] if overall else {},
+            'by_site': self.by_site.summary(site_labels, 'site_id'),
+            'by_hour': self.by_hour.summary(list(range(24)), 'hour'),
+            'by_month': self.by_month.summary(list(range(1, 13)), 'month'),
+            'by_cloud_band': self.by_cloud_band.summary(CLOUD_BAND_LABELS, 'cloud_band'),
+            'rows': self.rows,
+            'elapsed_seconds': self.elapsed_seconds,
+            'inference_seconds': self.inference_seconds,
+            'rows_per_second': self.rows / self.elapsed_seconds if self.elapsed_seconds > 0 else 0
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest the solar model against measured generation')
+    parser.add_argument('measurements', help='CSV file of site-hour measurements')
+    parser.add_argument('--chunk-size', type=int, default=500000)
+    parser.add_argument('--solar-time', action='store_true',
+                        help='timestamps are local solar time rather than UTC')
+    args = parser.parse_args()
+
+    from solar_prediction import SolarPowerPredictor
+    backtester = Backtester(SolarPowerPredictor(), chunk_size=args.chunk_size, utc=not args.solar_time)
+    results = backtester.run(args.measurements)
+
+    overall = results['overall']
+    print(f"Rows: {results['rows']}")
+    print(f"Throughput: {results['rows_per_second']:.0f} rows/s "
+          f"({results['inference_seconds']:.2f}s inference of {results['elapsed_seconds']:.2f}s)")
+    print(f"MAE: {overall.get('mae', 0):.2f}  RMSE: {overall.get('rmse', 0):.2f}  Bias: {overall.get('bias', 0):.2f}")
+
+    for key in ('by_site', 'by_hour', 'by_month', 'by_cloud_band'):
+        print(f"\n{key.replace('_', ' ').title()}")
+        print(results[key].to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
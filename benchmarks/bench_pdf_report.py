@@ -0,0 +1,122 @@
+"""
+Benchmark PDF report render time and peak memory
+
+Renders hourly series of increasing length, and fleet reports with an
+increasing number of sites, through ReportGenerator's chunked PDF path. For
+comparison the previous layout (one Table holding every row, with a fresh
+TableStyle) is rendered for the same series. Time is wall clock; memory is
+the tracemalloc peak of Python allocations during the render.
+
+Usage:
+    python benchmarks/bench_pdf_report.py
+    python benchmarks/bench_pdf_report.py --skip-legacy
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report_generator import ReportGenerator  # noqa: E402
+
+SERIES_LENGTHS = (24, 720, 2190, 8760)
+FLEET_SIZES = (1, 4, 16)
+FLEET_SERIES_LENGTH = 720
+
+
+def make_prediction(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    hours = np.arange(n_rows)
+    power = np.maximum(0, 500 * np.sin(np.pi * (hours % 24) / 24) * rng.uniform(0.5, 1, n_rows))
+    return {
+        'total_power': float(power.sum()),
+        'peak_power': float(power.max()),
+        'peak_hour': int(power.argmax() % 24),
+        'hourly_predictions': [{'hour': int(h), 'power': float(p)} for h, p in zip(hours, power)]
+    }
+
+
+def render_legacy(prediction, filepath):
+    """The previous layout: one Table for every row"""
+    rows = [['Hour', 'Power (W)', 'Cumulative (Wh)']]
+    cumulative = 0
+    for hour_data in prediction['hourly_predictions']:
+        cumulative += hour_data['power']
+        rows.append([f"{hour_data['hour']:02d}:00", f"{hour_data['power']:.2f}", f"{cumulative:.2f}"])
+    table = Table(rows)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    SimpleDocTemplate(filepath, pagesize=letter).build([table])
+
+
+def measure(render, trace=True):
+    start = time.perf_counter()
+    render()
+    seconds = time.perf_counter() - start
+    if not trace:
+        return seconds, None
+
+    tracemalloc.start()
+    render()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / (1024 * 1024)
+
+
+def print_row(label, rows, seconds, peak_mb):
+    peak = f"{peak_mb:>12.1f}" if peak_mb is not None else f"{'-':>12}"
+    print(f"{label:<22}{rows:>8}{seconds:>10.2f}{seconds / rows * 1e6:>12.1f}{peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PDF report rendering')
+    parser.add_argument('--skip-legacy', action='store_true', help='only benchmark the chunked renderer')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generator = ReportGenerator()
+        generator.reports_dir = tmp
+
+        print(f"{'renderer':<22}{'rows':>8}{'seconds':>10}{'us/row':>12}{'peak MB':>12}")
+        for n in SERIES_LENGTHS:
+            prediction = make_prediction(n)
+            path = os.path.join(tmp, f'chunked_{n}.pdf')
+            generator.chart_cache.clear()
+            seconds, _ = measure(lambda: generator.generate_multi_site_pdf_report({None: prediction}, path), trace=False)
+            print_row('chunked', n, seconds, None)
+
+            seconds, peak = measure(lambda: generator.generate_multi_site_pdf_report({None: prediction}, path))
+            print_row('chunked (chart cached)', n, seconds, peak)
+
+            if not args.skip_legacy:
+                seconds, peak = measure(lambda: render_legacy(prediction, os.path.join(tmp, f'legacy_{n}.pdf')))
+                print_row('single table', n, seconds, peak)
+
+        print(f"\nFleet reports, {FLEET_SERIES_LENGTH} hourly rows per site")
+        print(f"{'sites':<22}{'rows':>8}{'seconds':>10}{'us/row':>12}{'peak MB':>12}")
+        for n_sites in FLEET_SIZES:
+            sites = {f"Site {i + 1}": make_prediction(FLEET_SERIES_LENGTH, seed=i) for i in range(n_sites)}
+            path = os.path.join(tmp, f'fleet_{n_sites}.pdf')
+            seconds, peak = measure(lambda: generator.generate_multi_site_pdf_report(sites, path))
+            print_row(str(n_sites), n_sites * FLEET_SERIES_LENGTH, seconds, peak)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark payload size and serialization time of /api/predict response formats
+
+Compares the default list-of-dicts JSON (stdlib encoder, as used by
+jsonify) with the columnar and float32 formats from response_format.py,
+uncompressed and with gzip/brotli, for daily, monthly and annual outputs.
+
+Usage:
+    python benchmarks/bench_response_format.py
+"""
+
+import gzip
+import json
+import os
+import sys
+import timeit
+
+import brotli
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_format import columnarize, encode_json  # noqa: E402
+
+
+def make_prediction(n_rows, key, index_name, rng):
+    power = np.maximum(0, rng.normal(400, 250, n_rows))
+    rows = [{index_name: i, 'power': float(p)} for i, p in enumerate(power)]
+    return {
+        'total_power': float(power.sum()),
+        key: rows,
+        'peak_power': float(power.max()),
+        'peak_hour': int(power.argmax())
+    }
+
+
+def make_payload(n_rows, key, index_name, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'success': True,
+        'prediction': make_prediction(n_rows, key, index_name, rng),
+        'optimal_config': {'tilt': 40.7, 'azimuth': 180},
+        'optimal_prediction': make_prediction(n_rows, key, index_name, rng),
+        'improvement_percentage': 4.2,
+        'degraded': False
+    }
+
+
+SCENARIOS = {
+    'daily (24 h)': make_payload(24, 'hourly_predictions', 'hour'),
+    'monthly (30 d)': make_payload(30, 'daily_predictions', 'day'),
+    'annual (8760 h)': make_payload(8760, 'hourly_predictions', 'hour')
+}
+
+
+def encoders():
+    yield 'default json', lambda p: json.dumps(p).encode('utf-8'), None
+    yield 'default json+gzip', lambda p: json.dumps(p).encode('utf-8'), 'gzip'
+    for fmt in ('columnar', 'float32'):
+        yield fmt, lambda p, fmt=fmt: encode_json(columnarize(p, fmt)), None
+        yield f"{fmt}+gzip", lambda p, fmt=fmt: encode_json(columnarize(p, fmt)), 'gzip'
+        yield f"{fmt}+br", lambda p, fmt=fmt: encode_json(columnarize(p, fmt)), 'br'
+
+
+def measure(payload, encode, encoding, repeat=5):
+    def run():
+        body = encode(payload)
+        if encoding == 'gzip':
+            return gzip.compress(body, compresslevel=1)
+        if encoding == 'br':
+            return brotli.compress(body, quality=4)
+        return body
+
+    number = max(1, int(0.2 / max(timeit.timeit(run, number=1), 1e-6)))
+    seconds = min(timeit.repeat(run, number=number, repeat=repeat)) / number
+    return len(run()), seconds
+
+
+def main():
+    for name, payload in SCENARIOS.items():
+        print(f"\n{name}")
+        print(f"{'format':<20}{'bytes':>12}{'vs default':>12}{'encode ms':>12}{'speedup':>10}")
+        baseline_bytes = baseline_seconds = None
+        for label, encode, encoding in encoders():
+            size, seconds = measure(payload, encode, encoding)
+            if baseline_bytes is None:
+                baseline_bytes, baseline_seconds = size, seconds
+            print(f"{label:<20}{size:>12,}{size / baseline_bytes:>11.1%}{seconds * 1000:>12.3f}"
+                  f"{baseline_seconds / seconds:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
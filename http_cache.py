@@ -0,0 +1,114 @@
+"""
+HTTP validators for weather and prediction responses
+
+Weather responses carry an ``ETag`` and ``Last-Modified`` derived from the
+cached weather snapshot, and ``Cache-Control`` lasting until that snapshot
+expires, so browsers and proxies reuse them without asking again. Prediction
+ETags add the request body, the model version and the current hour (features
+use the hour of day); clients resend them in ``If-None-Match`` and get a
+304 without the prediction being recomputed. Predictions have no
+``Last-Modified``: a retrained model changes them without the snapshot
+changing, so they are revalidated by ETag only.
+
+Validators are only sent when the response was built from the cached
+snapshot, never for demo data served after a failed refresh.
+"""
+
+import hashlib
+import json
+import time
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+
+
+def make_etag(*parts):
+    """Weak ETag over JSON-serialisable parts (weak: gzip/brotli bodies share it)"""
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+
+    def opaque(tag):
+        tag = tag.strip()
+        return tag[2:] if tag.startswith('W/') else tag
+
+    return opaque(etag) in {opaque(tag) for tag in if_none_match.split(',')}
+
+
+def not_modified(request_headers, headers):
+    """Whether a request's validators match the response headers.
+
+    If-None-Match takes precedence; If-Modified-Since is only checked when
+    the request has no If-None-Match and the response has a Last-Modified.
+    """
+    if_none_match = request_headers.get('If-None-Match')
+    if if_none_match:
+        return etag_matches(if_none_match, headers['ETag'])
+
+    if_modified_since = request_headers.get('If-Modified-Since')
+    if if_modified_since and 'Last-Modified' in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(headers['Last-Modified']) <= since
+    return False
+
+
+def cache_headers(etag, last_modified, max_age, private=False):
+    """ETag, Cache-Control and (unless ``last_modified`` is None) Last-Modified headers"""
+    headers = {
+        'ETag': etag,
+        'Cache-Control': f"{'private' if private else 'public'}, max-age={max(0, int(max_age))}"
+    }
+    if last_modified is not None:
+        headers['Last-Modified'] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def weather_snapshot(provider, latitude, longitude, weather_data):
+    """(cache key, fetch time, seconds until expiry) of the snapshot ``weather_data`` was served from.
+
+    None when the location has no unexpired snapshot or ``weather_data`` is
+    not that snapshot.
+    """
+    fetched_at = provider.get_snapshot_time(latitude, longitude, served=weather_data)
+    if fetched_at is None:
+        return None
+    return provider._cache_key(latitude, longitude), fetched_at, provider.cache_ttl - (time.time() - fetched_at)
+
+
+def weather_cache_headers(provider, latitude, longitude, weather_data):
+    """Validators for served weather data, or None if it is not the cached snapshot"""
+    snapshot = weather_snapshot(provider, latitude, longitude, weather_data)
+    if snapshot is None:
+        return None
+
+    key, fetched_at, max_age = snapshot
+    return cache_headers(make_etag('weather', key, fetched_at), fetched_at, max_age)
+
+
+def prediction_cache_headers(provider, data, weather_data, model_version, fmt=None, now=None):
+    """Validators for a prediction made from the cached weather snapshot.
+
+    Returns None when ``weather_data`` is not the location's unexpired
+    snapshot. The response stays fresh until the snapshot expires or the hour
+    changes, whichever is first.
+    """
+    location = data['location']
+    snapshot = weather_snapshot(provider, location['latitude'], location['longitude'], weather_data)
+    if snapshot is None:
+        return None
+
+    key, fetched_at, max_age = snapshot
+    now = now or datetime.now()
+    seconds_to_next_hour = 3600 - (now.minute * 60 + now.second)
+
+    etag = make_etag('prediction', data, key, fetched_at, model_version, now.strftime('%Y-%m-%d %H'), fmt)
+    return cache_headers(etag, None, min(max_age, seconds_to_next_hour), private=True)
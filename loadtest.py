@@ -0,0 +1,381 @@
+"""
+Load-testing harness with a local stand-in for the weather and geocoding services
+
+Starts a stub server for OpenWeatherMap (/weather, /forecast) and Nominatim
+(/search) with a configurable latency, jitter and error-rate profile, points
+the app at it, and drives /api/predict, /api/weather and /api/report at a
+target request rate. Results (throughput, latency percentiles, error rates)
+are reproducible for a given --seed.
+
+Usage:
+    python loadtest.py --rps 50 --duration 30 --profile typical
+    python loadtest.py --target http://127.0.0.1:8080 --rps 20   # app already running
+    python loadtest.py --stub-only --stub-port 9100               # stub only
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import numpy as np
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+# Upstream behaviour: base latency and jitter in milliseconds, fraction of failed calls
+PROFILES = {
+    'fast': {'latency_ms': 20, 'jitter_ms': 5, 'error_rate': 0.0},
+    'typical': {'latency_ms': 150, 'jitter_ms': 50, 'error_rate': 0.01},
+    'slow': {'latency_ms': 800, 'jitter_ms': 300, 'error_rate': 0.02},
+    'flaky': {'latency_ms': 300, 'jitter_ms': 200, 'error_rate': 0.10}
+}
+
+# Share of traffic per endpoint
+DEFAULT_MIX = {'predict': 0.6, 'weather': 0.3, 'report': 0.1}
+
+REPORT_PAYLOAD = {
+    'type': 'csv',
+    'prediction_data': {
+        'total_power': 1000,
+        'hourly_predictions': [{'hour': h, 'power': max(0, 100 * math.sin(math.pi * (h - 6) / 12))} for h in range(24)]
+    }
+}
+
+
+def find_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class StubUpstream:
+    """Stand-in for OpenWeatherMap and Nominatim with injected latency and errors"""
+
+    def __init__(self, latency_ms=150, jitter_ms=50, error_rate=0.01, seed=42):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.seed = seed
+        self.call_counts = {}
+        self.requests = 0
+        self.errors = 0
+
+        self.app = Starlette(routes=[
+            Route('/data/2.5/weather', self.weather),
+            Route('/data/2.5/forecast', self.forecast),
+            Route('/search', self.search)
+        ])
+        self.server = None
+        self.thread = None
+
+    def _draw(self, path, params):
+        """Latency and failure for a call, fixed by the seed and the call's identity.
+
+        Draws depend on the path, the location or query and how many times
+        that same call has been made, not on the order requests arrive in, so
+        a seed injects the same latencies and errors under any concurrency.
+        """
+        identity = (path, params.get('lat'), params.get('lon'), params.get('q'))
+        n = self.call_counts.get(identity, 0)
+        self.call_counts[identity] = n + 1
+
+        rng = random.Random(f"{self.seed}|{'|'.join(map(str, identity))}|{n}")
+        delay = max(0, rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        return delay, rng.random() < self.error_rate
+
+    async def _delay(self, request):
+        """Sleep for the profile latency; return True when this call should fail"""
+        self.requests += 1
+        delay, fail = self._draw(request.url.path, request.query_params)
+        await asyncio.sleep(delay)
+        if fail:
+            self.errors += 1
+        return fail
+
+    def _conditions(self, lat, lon, offset=0):
+        # Deterministic per location so repeated runs see the same weather
+        seed = int((lat + 90) * 1000) * 1000003 + int((lon + 180) * 1000) + offset
+        rng = random.Random(seed)
+        return {
+            'main': {'temp': round(25 - abs(lat) * 0.4 + rng.uniform(-5, 5), 1), 'humidity': rng.randint(20, 95)},
+            'wind': {'speed': round(rng.uniform(0, 12), 1)},
+            'clouds': {'all': rng.randint(0, 100)},
+            'weather': [{'description': rng.choice(['clear sky', 'few clouds', 'scattered clouds', 'light rain'])}]
+        }
+
+    async def weather(self, request):
+        if await self._delay(request):
+            return JSONResponse({'cod': 500, 'message': 'stub upstream error'}, status_code=500)
+        lat = float(request.query_params.get('lat', 0))
+        lon = float(request.query_params.get('lon', 0))
+        return JSONResponse(self._conditions(lat, lon))
+
+    async def forecast(self, request):
+        if await self._delay(request):
+            return JSONResponse({'cod': 500, 'message': 'stub upstream error'}, status_code=500)
+        lat = float(request.query_params.get('lat', 0))
+        lon = float(request.query_params.get('lon', 0))
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+        entries = []
+        for i in range(40):
+            entry = self._conditions(lat, lon, offset=i + 1)
+            entry['dt_txt'] = (start + timedelta(hours=3 * i)).strftime('%Y-%m-%d %H:%M:%S')
+            entries.append(entry)
+        return JSONResponse({'cnt': len(entries), 'list': entries})
+
+    async def search(self, request):
+        if await self._delay(request):
+            return JSONResponse({'error': 'stub upstream error'}, status_code=500)
+        query = request.query_params.get('q', '')
+        rng = random.Random(query)
+        return JSONResponse([{
+            'lat': str(round(rng.uniform(-60, 60), 4)),
+            'lon': str(round(rng.uniform(-180, 180), 4)),
+            'display_name': f"{query} (stub)"
+        }])
+
+    def start(self, port):
+        config = uvicorn.Config(self.app, host='127.0.0.1', port=port, log_level='warning')
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+
+    def stop(self):
+        if self.server is not None:
+            self.server.should_exit = True
+            self.thread.join()
+
+
+def start_app(port, stub_port, data_dir, cache_ttl):
+    """Run the ASGI server in a subprocess pointed at the stub upstream.
+
+    Reports and prediction history go to ``data_dir``, so synthetic load
+    never reaches the real history store.
+    """
+    env = dict(os.environ)
+    env.update({
+        'OPENWEATHER_API_KEY': 'loadtest',
+        'OPENWEATHER_BASE_URL': f"http://127.0.0.1:{stub_port}/data/2.5",
+        'NOMINATIM_DOMAIN': f"127.0.0.1:{stub_port}",
+        'NOMINATIM_SCHEME': 'http',
+        'WEATHER_CACHE_TTL': str(cache_ttl),
+        'REPORTS_DIR': data_dir,
+        'HISTORY_DB': os.path.join(data_dir, 'predictions.db')
+    })
+    server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py')
+    return subprocess.Popen(
+        [sys.executable, server_path, '--host', '127.0.0.1', '--port', str(port)],
+        cwd=os.path.dirname(server_path),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+
+def wait_until_ready(base_url, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/api/weather/0/0", timeout=5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"App at {base_url} did not become ready within {timeout}s")
+
+
+def build_schedule(rps, duration, mix, seed):
+    """Poisson arrival times with an endpoint and location per request"""
+    rng = random.Random(seed)
+    endpoints = list(mix.keys())
+    weights = list(mix.values())
+
+    schedule = []
+    t = 0.0
+    while True:
+        t += rng.expovariate(rps)
+        if t >= duration:
+            break
+        schedule.append({
+            'at': t,
+            'endpoint': rng.choices(endpoints, weights)[0],
+            'latitude': round(rng.uniform(-55, 60), 2),
+            'longitude': round(rng.uniform(-180, 180), 2),
+            'prediction_type': rng.choice(['daily', 'daily', 'weekly', 'monthly', 'forecast'])
+        })
+    return schedule
+
+
+async def send(client, base_url, item):
+    if item['endpoint'] == 'predict':
+        return await client.post(f"{base_url}/api/predict", json={
+            'location': {'latitude': item['latitude'], 'longitude': item['longitude']},
+            'panel_config': {'area': 10, 'tilt': 30, 'azimuth': 180},
+            'prediction_type': item['prediction_type']
+        })
+    if item['endpoint'] == 'weather':
+        return await client.get(f"{base_url}/api/weather/{item['latitude']}/{item['longitude']}")
+    return await client.post(f"{base_url}/api/report", json=REPORT_PAYLOAD)
+
+
+async def drive(base_url, schedule, timeout):
+    """Fire the schedule open-loop and record status and latency per request"""
+    results = []
+    limits = httpx.Limits(max_connections=2000, max_keepalive_connections=200)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        start = time.perf_counter()
+
+        async def fire(item):
+            delay = item['at'] - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Latency is measured from the scheduled send time, so a stalled
+            # client does not hide server-side queueing
+            scheduled = start + item['at']
+            status = None
+            degraded = False
+            try:
+                response = await send(client, base_url, item)
+                status = response.status_code
+                if item['endpoint'] == 'predict' and status == 200:
+                    degraded = bool(response.json().get('degraded'))
+            except httpx.HTTPError:
+                status = 'exception'
+            results.append({
+                'endpoint': item['endpoint'],
+                'status': status,
+                'degraded': degraded,
+                'latency': time.perf_counter() - scheduled
+            })
+
+        await asyncio.gather(*(fire(item) for item in schedule))
+        elapsed = time.perf_counter() - start
+
+    return results, elapsed
+
+
+def summarise(results, elapsed):
+    """Throughput, latency percentiles and error rates per endpoint"""
+    summary = {}
+    for endpoint in sorted({r['endpoint'] for r in results}) + ['all']:
+        rows = [r for r in results if endpoint == 'all' or r['endpoint'] == endpoint]
+        latencies = np.array([r['latency'] for r in rows]) * 1000
+        ok = sum(1 for r in rows if r['status'] == 200)
+        shed = sum(1 for r in rows if r['status'] == 503)
+
+        summary[endpoint] = {
+            'requests': len(rows),
+            'throughput_rps': ok / elapsed if elapsed > 0 else 0,
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p90_ms': float(np.percentile(latencies, 90)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'max_ms': float(latencies.max()),
+            'error_rate': (len(rows) - ok) / len(rows),
+            'shed_rate': shed / len(rows),
+            'degraded': sum(1 for r in rows if r['degraded'])
+        }
+    return summary
+
+
+def print_summary(summary, elapsed, stub):
+    print(f"\nDuration: {elapsed:.1f}s")
+    header = f"{'endpoint':<10}{'requests':>9}{'ok rps':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}{'shed':>7}{'degraded':>10}"
+    print(header)
+    print('-' * len(header))
+    for endpoint, s in summary.items():
+        print(f"{endpoint:<10}{s['requests']:>9}{s['throughput_rps']:>9.1f}{s['p50_ms']:>9.0f}{s['p90_ms']:>9.0f}"
+              f"{s['p99_ms']:>9.0f}{s['max_ms']:>9.0f}{s['error_rate']:>8.1%}{s['shed_rate']:>7.1%}{s['degraded']:>10}")
+    if stub is not None:
+        print(f"\nStub upstream: {stub.requests} calls, {stub.errors} injected errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the API against a stub weather/geocoding upstream')
+    parser.add_argument('--rps', type=float, default=20, help='target request rate')
+    parser.add_argument('--duration', type=float, default=30, help='test length in seconds')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='typical')
+    parser.add_argument('--latency-ms', type=float, help='override the profile latency')
+    parser.add_argument('--jitter-ms', type=float, help='override the profile jitter')
+    parser.add_argument('--error-rate', type=float, help='override the profile error rate')
+    parser.add_argument('--mix', default=None, help='endpoint weights, e.g. predict=0.6,weather=0.3,report=0.1')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=30, help='client timeout per request')
+    parser.add_argument('--cache-ttl', type=int, default=0, help='weather cache TTL for the spawned app (0 disables it)')
+    parser.add_argument('--target', help='base URL of an already running app (skips spawning one)')
+    parser.add_argument('--app-port', type=int, default=None)
+    parser.add_argument('--stub-port', type=int, default=None)
+    parser.add_argument('--stub-only', action='store_true', help='only run the stub upstream')
+    parser.add_argument('--json', help='write the summary to this file')
+    args = parser.parse_args()
+
+    profile = dict(PROFILES[args.profile])
+    for key in ('latency_ms', 'jitter_ms', 'error_rate'):
+        if getattr(args, key) is not None:
+            profile[key] = getattr(args, key)
+
+    mix = DEFAULT_MIX
+    if args.mix:
+        mix = {name: float(weight) for name, weight in (part.split('=') for part in args.mix.split(','))}
+
+    stub = StubUpstream(seed=args.seed, **profile)
+    stub_port = args.stub_port or find_free_port()
+    stub.start(stub_port)
+    print(f"Stub upstream on http://127.0.0.1:{stub_port} ({profile})")
+
+    if args.stub_only:
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            stub.stop()
+            return
+
+    app_process = None
+    data_dir = tempfile.TemporaryDirectory(prefix='loadtest_data_')
+    try:
+        if args.target:
+            base_url = args.target.rstrip('/')
+        else:
+            app_port = args.app_port or find_free_port()
+            base_url = f"http://127.0.0.1:{app_port}"
+            app_process = start_app(app_port, stub_port, data_dir.name, args.cache_ttl)
+            print(f"Starting app on {base_url}...")
+        wait_until_ready(base_url)
+
+        schedule = build_schedule(args.rps, args.duration, mix, args.seed)
+        print(f"Sending {len(schedule)} requests at ~{args.rps} rps for {args.duration}s (seed {args.seed})")
+        results, elapsed = asyncio.run(drive(base_url, schedule, args.timeout))
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait()
+        stub.stop()
+        data_dir.cleanup()
+
+    summary = summarise(results, elapsed)
+    print_summary(summary, elapsed, stub)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'profile': profile, 'rps': args.rps, 'duration': args.duration,
+                       'seed': args.seed, 'elapsed': elapsed, 'endpoints': summary}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
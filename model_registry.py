@@ -0,0 +1,185 @@
+"""
+Per-region model registry
+
+Sites are grouped into latitude bands, each with its own model and scaler
+trained on synthetic data for that band (plus a small overlap with its
+neighbours). Regional models are loaded from ``models/regions/<region>`` on
+first use, or trained there if missing, and kept in memory under a budget
+measured by artifact size; the least recently used model is evicted first.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+from solar_prediction import SolarPowerPredictor
+
+REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', os.path.join('models', 'regions'))
+MEMORY_BUDGET_MB = float(os.getenv('MODEL_REGISTRY_MEMORY_MB', 512))
+
+# Latitude bands: name -> (lower, upper) bound in degrees; rows are routed by the lower bounds
+REGIONS = OrderedDict([
+    ('south_polar', (-90, -50)),
+    ('south_temperate', (-50, -23.5)),
+    ('tropical', (-23.5, 23.5)),
+    ('north_temperate', (23.5, 50)),
+    ('north_polar', (50, 90))
+])
+
+# Degrees of overlap with neighbouring bands in each region's training data
+TRAINING_OVERLAP = 5
+
+
+class ModelRegistry:
+    """Lazily loaded regional models with LRU eviction under a memory budget"""
+
+    def __init__(self, model_dir=REGISTRY_DIR, regions=REGIONS, memory_budget_mb=MEMORY_BUDGET_MB,
+                 training_samples=10000):
+        self.model_dir = model_dir
+        self.regions = regions
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.training_samples = training_samples
+
+        self.names = list(regions)
+        self.edges = np.array([bounds[0] for bounds in regions.values()][1:])
+
+        self._loaded = OrderedDict()  # region -> (predictor, size in bytes)
+        self._loading = {}  # region -> Future of a load in progress
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'load_seconds': 0.0}
+        self.load_times = {}
+
+    def region_for(self, latitude):
+        """Name of the region a latitude belongs to"""
+        return self.names[int(np.digitize(latitude, self.edges))]
+
+    def region_indices(self, latitudes):
+        """Region index for each latitude in an array"""
+        return np.digitize(np.asarray(latitudes, dtype=np.float64), self.edges)
+
+    def memory_used(self):
+        return sum(size for _, size in self._loaded.values())
+
+    def _load(self, region):
+        lower, upper = self.regions[region]
+        latitude_range = (max(-90, lower - TRAINING_OVERLAP), min(90, upper + TRAINING_OVERLAP))
+
+        start = time.perf_counter()
+        predictor = SolarPowerPredictor(
+            model_dir=os.path.join(self.model_dir, region),
+            latitude_range=latitude_range,
+            training_samples=self.training_samples
+        )
+        seconds = time.perf_counter() - start
+
+        size = os.path.getsize(predictor.model_path) + os.path.getsize(predictor.scaler_path)
+        return predictor, size, seconds
+
+    def get(self, region):
+        """Predictor for a region, loading (or training) it on first use.
+
+        Loading runs outside the registry lock, so lookups of loaded regions
+        never wait on it; concurrent first lookups of one region share a
+        single load.
+        """
+        if region not in self.regions:
+            raise ValueError(f"Unknown region '{region}', expected one of: {', '.join(self.names)}")
+
+        with self._lock:
+            if region in self._loaded:
+                self._stats['hits'] += 1
+                self._loaded.move_to_end(region)
+                return self._loaded[region][0]
+
+            pending = self._loading.get(region)
+            if pending is None:
+                self._stats['misses'] += 1
+                pending = self._loading[region] = Future()
+                loader = True
+            else:
+                self._stats['hits'] += 1
+                loader = False
+
+        if not loader:
+            return pending.result()
+
+        try:
+            predictor, size, seconds = self._load(region)
+        except Exception as e:
+            with self._lock:
+                del self._loading[region]
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            self._stats['load_seconds'] += seconds
+            self.load_times[region] = seconds
+
+            # Evict least recently used models until the new one fits; a
+            # model larger than the whole budget is still kept on its own.
+            while self._loaded and self.memory_used() + size > self.memory_budget:
+                evicted, _ = self._loaded.popitem(last=False)
+                self._stats['evictions'] += 1
+                print(f"Evicted regional model '{evicted}'")
+
+            self._loaded[region] = (predictor, size)
+            del self._loading[region]
+        pending.set_result(predictor)
+        return predictor
+
+    def predictor_for(self, latitude):
+        """Predictor for the region containing a latitude"""
+        return self.get(self.region_for(latitude))
+
+    def predict_batch(self, features_df):
+        """Score feature rows, routing each row to its region's model"""
+        indices = self.region_indices(features_df['latitude'].to_numpy())
+        predictions = np.zeros(len(features_df))
+
+        for index in np.unique(indices):
+            rows = np.flatnonzero(indices == index)
+            predictor = self.get(self.names[index])
+            predictions[rows] = predictor.predict_batch(features_df.iloc[rows])
+
+        return predictions
+
+    def stats(self):
+        """Hit rate, load latency and memory use of the registry"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'hits': self._stats['hits'],
+                'misses': self._stats['misses'],
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+                'evictions': self._stats['evictions'],
+                'average_load_seconds': self._stats['load_seconds'] / self._stats['misses'] if self._stats['misses'] else 0.0,
+                'load_times': dict(self.load_times),
+                'loaded': list(self._loaded),
+                'memory_used_mb': self.memory_used() / (1024 * 1024),
+                'memory_budget_mb': self.memory_budget / (1024 * 1024)
+            }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Train or load every regional model and report registry stats')
+    parser.add_argument('--model-dir', default=REGISTRY_DIR)
+    parser.add_argument('--memory-mb', type=float, default=MEMORY_BUDGET_MB)
+    args = parser.parse_args()
+
+    registry = ModelRegistry(model_dir=args.model_dir, memory_budget_mb=args.memory_mb)
+    for region in registry.names:
+        registry.get(region)
+        print(f"{region:<16} {registry.load_times[region]:.2f}s")
+
+    for key, value in registry.stats().items():
+        print(f"{key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
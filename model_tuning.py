@@ -0,0 +1,262 @@
+"""
+Parallel hyperparameter search with successive halving
+
+Candidates for each model type are scored with k-fold cross validation on
+growing subsets of the training data; after every rung only the best
+1/eta of them move on. Fold evaluations run across a process pool. The
+pre-scaled fold matrices live in shared memory, so workers read them
+without each receiving a copy of the data. The objective rewards accuracy
+(R²) and penalises inference latency.
+"""
+
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold
+from sklearn.preprocessing import StandardScaler
+
+MODEL_TYPES = {
+    'rf': RandomForestRegressor,
+    'gb': GradientBoostingRegressor
+}
+
+PARAM_GRIDS = {
+    'rf': {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [None, 12, 20],
+        'min_samples_leaf': [1, 3]
+    },
+    'gb': {
+        'n_estimators': [100, 200],
+        'learning_rate': [0.05, 0.1],
+        'max_depth': [3, 5]
+    }
+}
+
+# Shared-memory views attached in each worker process
+_shared = {}
+
+
+def expand_grid(grids):
+    """List (model_type, params) for every combination in the grids"""
+    candidates = []
+    for name, grid in grids.items():
+        keys = list(grid.keys())
+        for values in itertools.product(*(grid[k] for k in keys)):
+            candidates.append((name, dict(zip(keys, values))))
+    return candidates
+
+
+class SharedFolds:
+    """Pre-scaled cross-validation folds held in shared memory.
+
+    ``X`` has shape (k, n, f): fold ``i`` holds every row scaled with the
+    statistics of its own training rows. ``fold_ids`` assigns each row to
+    the fold in which it is held out.
+    """
+
+    def __init__(self, X, y, n_folds=3, random_state=42):
+        n = len(X)
+        self.fold_ids = np.empty(n, dtype=np.int64)
+        folds = KFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+        for i, (_, test_idx) in enumerate(folds.split(X)):
+            self.fold_ids[test_idx] = i
+
+        X_folds = np.empty((n_folds,) + X.shape, dtype=np.float64)
+        for i in range(n_folds):
+            scaler = StandardScaler().fit(X[self.fold_ids != i])
+            X_folds[i] = scaler.transform(X)
+
+        self.blocks = {}
+        self.specs = {}
+        for key, array in (('X', X_folds), ('y', np.asarray(y, dtype=np.float64)), ('fold_ids', self.fold_ids)):
+            block = shared_memory.SharedMemory(create=True, size=array.nbytes)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            self.blocks[key] = block
+            self.specs[key] = (block.name, array.shape, array.dtype.str)
+        self.n_folds = n_folds
+
+    def close(self):
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+
+def attach_shared(specs, owned=False):
+    """Map the shared fold arrays into this process"""
+    _shared.clear()
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        if not owned:
+            # Only the creating process may unlink the block; stop this
+            # process's resource tracker from removing it on exit.
+            resource_tracker.unregister(block._name, 'shared_memory')
+        _shared[key] = (block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf))
+
+
+def evaluate_fold(task):
+    """Fit one candidate on one fold's training rows and score it on the held-out rows"""
+    name, params, fold, n_train, random_state = task
+    X = _shared['X'][1][fold]
+    y = _shared['y'][1]
+    fold_ids = _shared['fold_ids'][1]
+
+    train_idx = np.flatnonzero(fold_ids != fold)[:n_train]
+    test_idx = np.flatnonzero(fold_ids == fold)
+
+    model = MODEL_TYPES[name](random_state=random_state, **params)
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - start
+
+    X_test = X[test_idx]
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    latency = (time.perf_counter() - start) / len(test_idx)
+
+    return r2_score(y[test_idx], y_pred), latency, fit_seconds
+
+
+class SuccessiveHalvingSearch:
+    """Successive-halving search over the model candidates.
+
+    Rung ``r`` trains on ``n / eta**(rungs - 1 - r)`` rows per fold and keeps
+    the top ``1/eta`` candidates by objective. The objective is
+    ``r2 - latency_weight * (ms per 1000 predicted rows)``.
+    """
+
+    def __init__(self, grids=None, n_folds=3, eta=3, rungs=3, latency_weight=0.001,
+                 n_jobs=None, random_state=42):
+        self.grids = grids or PARAM_GRIDS
+        self.n_folds = n_folds
+        self.eta = eta
+        self.rungs = rungs
+        self.latency_weight = latency_weight
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.random_state = random_state
+        self.history = []
+
+    def objective(self, r2, latency):
+        return r2 - self.latency_weight * latency * 1e6  # seconds/row -> ms per 1000 rows
+
+    def _run_rungs(self, folds, n_rows, map_tasks):
+        candidates = expand_grid(self.grids)
+        n_train_full = int(np.sum(folds.fold_ids != 0))
+        history = []
+
+        for rung in range(self.rungs):
+            n_train = max(50, n_train_full // self.eta ** (self.rungs - 1 - rung))
+            tasks = [
+                (name, params, fold, n_train, self.random_state)
+                for name, params in candidates
+                for fold in range(folds.n_folds)
+            ]
+            results = list(map_tasks(tasks))
+
+            scored = []
+            for i, (name, params) in enumerate(candidates):
+                fold_results = results[i * folds.n_folds:(i + 1) * folds.n_folds]
+                r2 = float(np.mean([r[0] for r in fold_results]))
+                latency = float(np.mean([r[1] for r in fold_results]))
+                scored.append({
+                    'rung': rung,
+                    'n_train': n_train,
+                    'name': name,
+                    'params': params,
+                    'r2': r2,
+                    'latency_ms_per_1k': latency * 1e6,
+                    'objective': self.objective(r2, latency)
+                })
+            scored.sort(key=lambda s: s['objective'], reverse=True)
+            history.extend(scored)
+
+            keep = max(1, len(candidates) // self.eta)
+            candidates = [(s['name'], s['params']) for s in scored[:keep]]
+
+        return scored[0], history
+
+    def run(self, X, y, compare_sequential=False):
+        """Search for the best candidate on (X, y).
+
+        Returns a dict with the winning model type and parameters, an
+        unfitted estimator, the per-rung history and the wall-clock time.
+        With ``compare_sequential`` the same search is repeated in-process
+        and the parallel speedup is reported.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        folds = SharedFolds(X, y, n_folds=self.n_folds, random_state=self.random_state)
+        try:
+            start = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=self.n_jobs, initializer=attach_shared,
+                                     initargs=(folds.specs,)) as pool:
+                best, history = self._run_rungs(folds, len(X), lambda tasks: pool.map(evaluate_fold, tasks))
+            parallel_seconds = time.perf_counter() - start
+
+            result = {
+                'name': best['name'],
+                'params': best['params'],
+                'estimator': MODEL_TYPES[best['name']](random_state=self.random_state, **best['params']),
+                'best': best,
+                'history': history,
+                'n_jobs': self.n_jobs,
+                'parallel_seconds': parallel_seconds
+            }
+
+            if compare_sequential:
+                attach_shared(folds.specs, owned=True)
+                start = time.perf_counter()
+                self._run_rungs(folds, len(X), lambda tasks: map(evaluate_fold, tasks))
+                result['sequential_seconds'] = time.perf_counter() - start
+                result['speedup'] = result['sequential_seconds'] / parallel_seconds
+                for block, _ in _shared.values():
+                    block.close()
+                _shared.clear()
+        finally:
+            folds.close()
+
+        self.history = history
+        return result
+
+
+def main():
+    import argparse
+    from solar_prediction import SolarPowerPredictor
+
+    parser = argparse.ArgumentParser(description='Tune the solar model with parallel successive halving')
+    parser.add_argument('--samples', type=int, default=10000, help='synthetic training rows')
+    parser.add_argument('--n-jobs', type=int, default=None)
+    parser.add_argument('--latency-weight', type=float, default=0.001)
+    parser.add_argument('--compare-sequential', action='store_true', help='also run sequentially and report the speedup')
+    parser.add_argument('--retrain', action='store_true', help='retrain and save the model with tuning enabled')
+    args = parser.parse_args()
+
+    predictor = SolarPowerPredictor()
+    if args.retrain:
+        predictor.train_model(tune=True, n_jobs=args.n_jobs)
+        return
+
+    df = predictor.generate_synthetic_data(n_samples=args.samples)
+    search = SuccessiveHalvingSearch(n_jobs=args.n_jobs, latency_weight=args.latency_weight)
+    result = search.run(df[predictor.feature_columns].to_numpy(), df['solar_power'].to_numpy(),
+                        compare_sequential=args.compare_sequential)
+
+    print(f"{'rung':>4}{'rows':>8}  {'model':<6}{'R²':>8}{'ms/1k':>8}{'objective':>11}  params")
+    for entry in search.history:
+        print(f"{entry['rung']:>4}{entry['n_train']:>8}  {entry['name']:<6}{entry['r2']:>8.4f}"
+              f"{entry['latency_ms_per_1k']:>8.2f}{entry['objective']:>11.4f}  {entry['params']}")
+
+    print(f"\nBest: {result['name']} {result['params']}")
+    print(f"Parallel search: {result['parallel_seconds']:.1f}s on {result['n_jobs']} workers")
+    if 'speedup' in result:
+        print(f"Sequential search: {result['sequential_seconds']:.1f}s (speedup {result['speedup']:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Prediction history store
+
+Every /api/predict result is queued and written to an embedded SQLite
+database by a background thread in batches, so the request path never waits
+on disk. Each batch also upserts per-site, per-day, per-prediction-type
+rollups in the same transaction; daily and monthly analytics are read from the rollup table
+instead of being recomputed from the raw rows.
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+HISTORY_DB = os.getenv('HISTORY_DB', 'data/predictions.db')
+HISTORY_BATCH_SIZE = int(os.getenv('HISTORY_BATCH_SIZE', 256))
+HISTORY_FLUSH_INTERVAL = float(os.getenv('HISTORY_FLUSH_INTERVAL', 1.0))
+HISTORY_QUEUE_SIZE = int(os.getenv('HISTORY_QUEUE_SIZE', 10000))
+
+PERIODS = {
+    'daily': 'day',
+    'monthly': 'substr(day, 1, 7)'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    site TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    day TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    prediction_type TEXT NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    panel_area REAL,
+    tilt REAL,
+    azimuth REAL,
+    total_power REAL,
+    peak_power REAL,
+    optimal_total_power REAL,
+    degraded INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_site_ts ON predictions (site, ts);
+CREATE INDEX IF NOT EXISTS idx_predictions_ts ON predictions (ts);
+CREATE INDEX IF NOT EXISTS idx_predictions_model_ts ON predictions (model_version, ts);
+
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    site TEXT NOT NULL,
+    day TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    prediction_type TEXT NOT NULL,
+    n_predictions INTEGER NOT NULL,
+    total_power REAL NOT NULL,
+    optimal_total_power REAL NOT NULL,
+    peak_power REAL NOT NULL,
+    PRIMARY KEY (site, day, model_version, prediction_type)
+);
+CREATE INDEX IF NOT EXISTS idx_rollups_type_day ON daily_rollups (prediction_type, day);
+CREATE INDEX IF NOT EXISTS idx_rollups_model_day ON daily_rollups (model_version, day);
+"""
+
+# Bumped when the rollup layout changes; older rollups are rebuilt from the raw rows
+SCHEMA_VERSION = 1
+
+REBUILD_ROLLUPS = """
+INSERT INTO daily_rollups (site, day, model_version, prediction_type, n_predictions,
+                           total_power, optimal_total_power, peak_power)
+SELECT site, day, model_version, prediction_type, count(*),
+       sum(total_power), sum(optimal_total_power), max(peak_power)
+FROM predictions
+GROUP BY site, day, model_version, prediction_type
+"""
+
+INSERT_PREDICTION = """
+INSERT INTO predictions (
+    site, ts, day, model_version, prediction_type, latitude, longitude,
+    panel_area, tilt, azimuth, total_power, peak_power, optimal_total_power, degraded
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO daily_rollups (site, day, model_version, prediction_type, n_predictions,
+                           total_power, optimal_total_power, peak_power)
+VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+ON CONFLICT (site, day, model_version, prediction_type) DO UPDATE SET
+    n_predictions = n_predictions + 1,
+    total_power = total_power + excluded.total_power,
+    optimal_total_power = optimal_total_power + excluded.optimal_total_power,
+    peak_power = max(peak_power, excluded.peak_power)
+"""
+
+
+def site_id(latitude, longitude):
+    """Site key for a location, rounded to about 1 km"""
+    return f"{float(latitude):.2f},{float(longitude):.2f}"
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class PredictionHistory:
+    """Batched, asynchronous writer and rollup reader for prediction history"""
+
+    def __init__(self, path=HISTORY_DB, batch_size=HISTORY_BATCH_SIZE,
+                 flush_interval=HISTORY_FLUSH_INTERVAL, max_queue=HISTORY_QUEUE_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = {'queued': 0, 'written': 0, 'dropped': 0, 'batches': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = connect(path)
+        try:
+            self._migrate(conn)
+        finally:
+            conn.close()
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._run, name='prediction-history', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _migrate(self, conn):
+        """Create the schema, rebuilding rollups written by an older layout"""
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            conn.executescript(SCHEMA)
+            return
+
+        # One transaction, so a failed rebuild leaves the old rollups in place
+        conn.executescript(f"""
+            BEGIN;
+            DROP TABLE IF EXISTS daily_rollups;
+            {SCHEMA}
+            {REBUILD_ROLLUPS};
+            PRAGMA user_version = {SCHEMA_VERSION};
+            COMMIT;
+        """)
+
+    def record(self, data, result, model_version, timestamp=None):
+        """Queue a prediction request and its result; never blocks the caller.
+
+        When the queue is full (the disk cannot keep up) the row is dropped
+        and counted in ``stats['dropped']``.
+        """
+        ts = timestamp or datetime.now(timezone.utc)
+        location = data['location']
+        panel_config = data['panel_config']
+        prediction = result['prediction']
+        row = (
+            data.get('site') or site_id(location['latitude'], location['longitude']),
+            ts.isoformat(timespec='seconds'),
+            ts.strftime('%Y-%m-%d'),
+            model_version,
+            data.get('prediction_type', 'daily'),
+            float(location['latitude']),
+            float(location['longitude']),
+            float(panel_config['area']),
+            float(panel_config.get('tilt', 30)),
+            float(panel_config.get('azimuth', 180)),
+            float(prediction['total_power']),
+            float(prediction.get('peak_power', 0)),
+            float(result['optimal_prediction']['total_power']),
+            int(bool(result.get('degraded')))
+        )
+        try:
+            self._queue.put_nowait(row)
+            self.stats['queued'] += 1
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+    def _run(self):
+        conn = connect(self.path)
+        try:
+            while not (self._stop.is_set() and self._queue.empty()):
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    self._write_batch(conn, batch)
+                except sqlite3.Error as e:
+                    print(f"Error writing prediction history: {e}")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn, batch):
+        with conn:
+            conn.executemany(INSERT_PREDICTION, batch)
+            conn.executemany(UPSERT_ROLLUP, [
+                (row[0], row[2], row[3], row[4], row[10], row[12], row[11]) for row in batch
+            ])
+        self.stats['written'] += len(batch)
+        self.stats['batches'] += 1
+
+    def flush(self):
+        """Block until every queued prediction has been written"""
+        self._queue.join()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._stop.set()
+            self._writer.join()
+
+    def rollups(self, period='daily', site=None, model_version=None, start=None, end=None,
+                prediction_type='daily'):
+        """Aggregated history per day or month, read from the rollup table.
+
+        Totals of different prediction types (a day, a week, a 5-day
+        forecast) are never added together; ``prediction_type`` picks one.
+        ``start`` and ``end`` are inclusive ``YYYY-MM-DD`` dates.
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period '{period}', expected one of: {', '.join(PERIODS)}")
+
+        conditions, params = ['prediction_type = ?'], [prediction_type]
+        for clause, value in (('site = ?', site), ('model_version = ?', model_version),
+                              ('day >= ?', start), ('day <= ?', end)):
+            if value is not None:
+                conditions.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}"
+
+        key = PERIODS[period]
+        sql = f"""
+            SELECT {key} AS period, sum(n_predictions), sum(total_power),
+                   sum(optimal_total_power), max(peak_power), count(DISTINCT site)
+            FROM daily_rollups {where}
+            GROUP BY period ORDER BY period
+        """
+        conn = connect(self.path)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+        return [{
+            'period': period_key,
+            'n_predictions': n,
+            'total_power': total,
+            'average_power': total / n,
+            'optimal_total_power': optimal,
+            'peak_power': peak,
+            'sites': sites
+        } for period_key, n, total, optimal, peak, sites in rows]
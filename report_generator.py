@@ -1,83 +1,289 @@
 import pandas as pd
+import numpy as np
+import base64
+import hashlib
+import io
 import os
 from datetime import datetime
+from openpyxl import Workbook
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
+from reportlab.lib.units import inch
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:
+    # The Figure API (not pyplot) is safe to use from report worker threads
+    from matplotlib.figure import Figure
+except ImportError:
+    Figure = None
+
+# Excel worksheets hold at most 1,048,576 rows (one is the header)
+EXCEL_MAX_ROWS = 1048575
+
+# PDF styles are built once and shared by every report
+PDF_STYLES = getSampleStyleSheet()
+SUMMARY_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 14),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+DATA_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+# Data rows per PDF table: about one letter page with the default margins
+PDF_ROWS_PER_TABLE = 35
+PDF_TABLE_WIDTH = 6.5 * inch
+
+# Rendered chart PNGs kept per generator, keyed by a hash of the series
+CHART_CACHE_SIZE = 64
 
 class ReportGenerator:
     def __init__(self):
-        self.reports_dir = 'reports'
+        self.reports_dir = os.getenv('REPORTS_DIR', 'reports')
+        self.chart_cache = {}
         os.makedirs(self.reports_dir, exist_ok=True)
     
     def generate_csv_report(self, prediction_data):
         """Generate CSV report from prediction data"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'solar_prediction_report_{timestamp}.csv'
-        filepath = os.path.join(self.reports_dir, filename)
-        
-        # Prepare data for CSV
-        data = []
+        filepath = self._report_path('csv')
         
         if 'hourly_predictions' in prediction_data:
-            # Daily report
-            for hour_data in prediction_data['hourly_predictions']:
-                data.append({
-                    'Time': f"{hour_data['hour']:02d}:00",
-                    'Power (W)': round(hour_data['power'], 2),
-                    'Cumulative (Wh)': round(sum(p['power'] for p in prediction_data['hourly_predictions'][:hour_data['hour']+1]), 2)
-                })
+            header = ['Time', 'Power (W)', 'Cumulative (Wh)']
         elif 'daily_predictions' in prediction_data:
             # Weekly/Monthly report
-            for day_data in prediction_data['daily_predictions']:
-                data.append({
-                    'Day': day_data['day'],
-                    'Power (Wh)': round(day_data['power'], 2),
-                    'Cumulative (Wh)': round(sum(p['power'] for p in prediction_data['daily_predictions'][:day_data['day']]), 2)
-                })
-        
-        # Add summary data
-        if data:  # Only add summary if there's data
-            data.append({
-                'Time': 'TOTAL',
-                'Power (W)': round(prediction_data['total_power'], 2),
-                'Cumulative (Wh)': round(prediction_data['total_power'], 2)
+            header = ['Day', 'Power (Wh)', 'Cumulative (Wh)']
+        else:
+            header = None
+        
+        df = pd.DataFrame()
+        if header is not None:
+            columns = self.series_to_arrays(prediction_data)
+            df = pd.DataFrame({
+                header[0]: self.series_labels(columns),
+                header[1]: np.round(columns['power'], 2),
+                header[2]: np.round(columns['cumulative'], 2)
             })
+            
+            # Add summary data
+            if len(df):
+                total = round(prediction_data['total_power'], 2)
+                df.loc[len(df)] = ['TOTAL', total, total]
         
-        # Create DataFrame and save
-        df = pd.DataFrame(data)
         df.to_csv(filepath, index=False)
+        return filepath
+    
+    def series_to_arrays(self, prediction_data):
+        """Convert the prediction series to NumPy column arrays.
+        
+        Accepts the default list-of-dicts series as well as the columnar and
+        float32 series of the compact response formats.
+        """
+        if 'hourly_predictions' in prediction_data:
+            series, index_name = prediction_data['hourly_predictions'], 'hour'
+        elif 'daily_predictions' in prediction_data:
+            series, index_name = prediction_data['daily_predictions'], 'day'
+        else:
+            raise ValueError("Prediction data has no hourly or daily series")
+        
+        if isinstance(series, dict):
+            # Columnar series: {'length': n, 'columns': {...}}
+            columns = {}
+            for name, values in series['columns'].items():
+                if isinstance(values, dict):
+                    values = np.frombuffer(base64.b64decode(values['data']), dtype='<f4')
+                columns[name] = np.asarray(values)
+        else:
+            n = len(series)
+            columns = {}
+            for name, sample in (series[0].items() if n else [(index_name, 0), ('power', 0.0)]):
+                if isinstance(sample, str):
+                    columns[name] = np.array([row[name] for row in series])
+                else:
+                    columns[name] = np.fromiter((row[name] for row in series), dtype=np.float64, count=n)
+            columns[index_name] = columns[index_name].astype(np.int64)
+        
+        columns['power'] = columns['power'].astype(np.float64)
+        columns['cumulative'] = np.cumsum(columns['power'])
+        return columns
+    
+    def series_labels(self, columns):
+        """Row labels for series arrays: forecast datetimes, 'HH:00' hours or day numbers"""
+        if 'datetime' in columns:
+            return columns['datetime'].astype(str)
+        if 'hour' in columns:
+            return np.char.add(np.char.zfill(columns['hour'].astype(str), 2), ':00')
+        return columns['day'].astype(str)
+    
+    def _iter_chunks(self, data, chunk_size):
+        """Yield column-dict chunks from a dict of arrays or an iterable of such dicts"""
+        if isinstance(data, dict):
+            n = len(next(iter(data.values()))) if data else 0
+            for start in range(0, n, chunk_size):
+                yield {name: values[start:start + chunk_size] for name, values in data.items()}
+        else:
+            yield from data
+    
+    def _report_path(self, extension):
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return os.path.join(self.reports_dir, f'solar_prediction_report_{timestamp}.{extension}')
+    
+    def export_arrays(self, data, fmt='parquet', filepath=None, row_group_size=131072, compression='zstd'):
+        """Write columns of NumPy arrays to Parquet, Arrow IPC or Excel.
+        
+        ``data`` is a dict of equal-length arrays, or an iterable of such dicts
+        for outputs too large to hold in memory at once (multi-site,
+        multi-year batches). Rows are written in chunks of ``row_group_size``,
+        which become Parquet row groups / Arrow record batches.
+        """
+        if filepath is None:
+            filepath = self._report_path({'parquet': 'parquet', 'arrow': 'arrow', 'xlsx': 'xlsx'}[fmt])
+        
+        chunks = self._iter_chunks(data, row_group_size)
+        
+        if fmt == 'xlsx':
+            self._write_excel(chunks, filepath)
+            return filepath
+        
+        if pa is None:
+            raise ImportError("pyarrow is required for Parquet and Arrow exports")
+        
+        writer = None
+        try:
+            for chunk in chunks:
+                batch = pa.RecordBatch.from_pydict({name: self._to_arrow(values) for name, values in chunk.items()})
+                if writer is None:
+                    if fmt == 'parquet':
+                        writer = pq.ParquetWriter(filepath, batch.schema, compression=compression)
+                    else:
+                        # Arrow IPC buffers only support lz4 and zstd compression
+                        ipc_compression = compression if compression in ('lz4', 'zstd') else None
+                        options = pa.ipc.IpcWriteOptions(compression=ipc_compression)
+                        writer = pa.ipc.new_file(filepath, batch.schema, options=options)
+                if fmt == 'parquet':
+                    writer.write_batch(batch, row_group_size=row_group_size)
+                else:
+                    writer.write_batch(batch)
+        finally:
+            if writer is not None:
+                writer.close()
         
         return filepath
     
+    def _to_arrow(self, values):
+        """Wrap a NumPy column as an Arrow array (zero-copy for numeric columns)"""
+        values = np.asarray(values)
+        if values.dtype.kind == 'M' and np.datetime_data(values.dtype)[0] not in ('s', 'ms', 'us', 'ns'):
+            # Arrow timestamps only support second to nanosecond units
+            values = values.astype('datetime64[s]')
+        return pa.array(values)
+    
+    def _write_excel(self, chunks, filepath):
+        """Stream column chunks into a write-only openpyxl workbook"""
+        workbook = Workbook(write_only=True)
+        sheet = None
+        header = None
+        rows_in_sheet = 0
+        
+        for chunk in chunks:
+            if header is None:
+                header = list(chunk.keys())
+            rows = zip(*(np.asarray(values).tolist() for values in chunk.values()))
+            for row in rows:
+                if sheet is None or rows_in_sheet >= EXCEL_MAX_ROWS:
+                    sheet = workbook.create_sheet(f"Predictions {len(workbook.worksheets) + 1}")
+                    sheet.append(header)
+                    rows_in_sheet = 0
+                sheet.append(row)
+                rows_in_sheet += 1
+        
+        if sheet is None:
+            workbook.create_sheet("Predictions 1")
+        workbook.save(filepath)
+    
+    def generate_parquet_report(self, prediction_data):
+        """Generate a Parquet report from prediction data"""
+        return self.export_arrays(self.series_to_arrays(prediction_data), 'parquet')
+    
+    def generate_arrow_report(self, prediction_data):
+        """Generate an Arrow IPC report from prediction data"""
+        return self.export_arrays(self.series_to_arrays(prediction_data), 'arrow')
+    
+    def generate_excel_report(self, prediction_data):
+        """Generate an Excel report from prediction data"""
+        return self.export_arrays(self.series_to_arrays(prediction_data), 'xlsx')
+    
     def generate_pdf_report(self, prediction_data):
         """Generate PDF report from prediction data"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'solar_prediction_report_{timestamp}.pdf'
-        filepath = os.path.join(self.reports_dir, filename)
+        return self.generate_multi_site_pdf_report({None: prediction_data})
+    
+    def generate_multi_site_pdf_report(self, sites, filepath=None):
+        """Generate one PDF covering several sites.
+        
+        ``sites`` maps site names to prediction data. A fleet summary table
+        comes first, then a summary, chart and data table per site. Long series
+        are split into page-sized tables so layout time stays linear.
+        """
+        if filepath is None:
+            filepath = self._report_path('pdf')
         
-        # Create PDF document
         doc = SimpleDocTemplate(filepath, pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
+        story = [
+            Paragraph("Solar Power Generation Prediction Report", PDF_STYLES['Title']),
+            Spacer(1, 12),
+            Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", PDF_STYLES['Normal']),
+            Spacer(1, 12)
+        ]
         
-        # Title
-        title = Paragraph("Solar Power Generation Prediction Report", styles['Title'])
-        story.append(title)
-        story.append(Spacer(1, 12))
+        if len(sites) > 1:
+            story.append(Paragraph("Fleet Summary", PDF_STYLES['Heading2']))
+            fleet_data = [['Site', 'Total (Wh)', 'Peak (W)']]
+            for name, prediction_data in sites.items():
+                fleet_data.append([
+                    str(name),
+                    f"{prediction_data['total_power']:.2f}",
+                    f"{prediction_data.get('peak_power', 0):.2f}"
+                ])
+            story.extend(self._chunked_tables(fleet_data))
+            story.append(PageBreak())
         
-        # Report info
-        report_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        info_text = f"Generated on: {report_date}"
-        info = Paragraph(info_text, styles['Normal'])
-        story.append(info)
-        story.append(Spacer(1, 12))
+        for i, (name, prediction_data) in enumerate(sites.items()):
+            if i > 0:
+                story.append(PageBreak())
+            story.extend(self._site_story(name, prediction_data))
         
-        # Summary section
-        summary_title = Paragraph("Summary", styles['Heading2'])
-        story.append(summary_title)
+        doc.build(story)
         
+        return filepath
+    
+    def _site_story(self, name, prediction_data):
+        """Flowables for one site: summary, chart and chunked data table"""
+        story = []
+        if name is not None:
+            story.append(Paragraph(str(name), PDF_STYLES['Heading1']))
+        
+        # Summary section
+        story.append(Paragraph("Summary", PDF_STYLES['Heading2']))
         summary_data = [
             ['Metric', 'Value'],
             ['Total Power Generation', f"{prediction_data['total_power']:.2f} Wh"],
@@ -85,84 +291,73 @@ class ReportGenerator:
             ['Peak Hour', f"{prediction_data.get('peak_hour', 'N/A')}:00"],
             ['Average Daily', f"{prediction_data.get('average_daily', 0):.2f} Wh"]
         ]
-        
-        summary_table = Table(summary_data)
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(summary_table)
+        story.append(Table(summary_data, style=SUMMARY_TABLE_STYLE))
         story.append(Spacer(1, 12))
         
         # Detailed data section
         if 'hourly_predictions' in prediction_data:
-            # Daily report
-            data_title = Paragraph("Hourly Power Generation", styles['Heading2'])
-            story.append(data_title)
-            
-            # Prepare hourly data
-            hourly_data = [['Hour', 'Power (W)', 'Cumulative (Wh)']]
-            cumulative = 0
-            for hour_data in prediction_data['hourly_predictions']:
-                cumulative += hour_data['power']
-                hourly_data.append([
-                    f"{hour_data['hour']:02d}:00",
-                    f"{hour_data['power']:.2f}",
-                    f"{cumulative:.2f}"
-                ])
-            
-            hourly_table = Table(hourly_data)
-            hourly_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(hourly_table)
-            
+            title, header = "Hourly Power Generation", ['Hour', 'Power (W)', 'Cumulative (Wh)']
         elif 'daily_predictions' in prediction_data:
-            # Weekly/Monthly report
-            data_title = Paragraph("Daily Power Generation", styles['Heading2'])
-            story.append(data_title)
-            
-            # Prepare daily data
-            daily_data = [['Day', 'Power (Wh)', 'Cumulative (Wh)']]
-            cumulative = 0
-            for day_data in prediction_data['daily_predictions']:
-                cumulative += day_data['power']
-                daily_data.append([
-                    str(day_data['day']),
-                    f"{day_data['power']:.2f}",
-                    f"{cumulative:.2f}"
-                ])
-            
-            daily_table = Table(daily_data)
-            daily_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(daily_table)
+            title, header = "Daily Power Generation", ['Day', 'Power (Wh)', 'Cumulative (Wh)']
+        else:
+            return story
         
-        # Build PDF
-        doc.build(story)
+        columns = self.series_to_arrays(prediction_data)
+        labels = self.series_labels(columns)
         
-        return filepath
+        chart = self._chart_image(columns['power'], header[1])
+        if chart is not None:
+            story.append(chart)
+            story.append(Spacer(1, 12))
+        
+        story.append(Paragraph(title, PDF_STYLES['Heading2']))
+        rows = np.column_stack([
+            labels,
+            np.char.mod('%.2f', columns['power']),
+            np.char.mod('%.2f', columns['cumulative'])
+        ]).tolist()
+        story.extend(self._chunked_tables([header] + rows))
+        
+        return story
+    
+    def _chunked_tables(self, data, rows_per_table=PDF_ROWS_PER_TABLE):
+        """Split header + rows into page-sized tables sharing one style.
+        
+        Fixed column widths skip reportlab's per-cell width measurement, and
+        small tables avoid re-splitting one huge table on every page.
+        """
+        header, rows = data[0], data[1:]
+        col_widths = [PDF_TABLE_WIDTH / len(header)] * len(header)
+        tables = []
+        for start in range(0, max(len(rows), 1), rows_per_table):
+            tables.append(Table(
+                [header] + rows[start:start + rows_per_table],
+                colWidths=col_widths,
+                repeatRows=1,
+                style=DATA_TABLE_STYLE
+            ))
+        return tables
+    
+    def _chart_image(self, power, ylabel):
+        """Line chart of a power series as a PDF image, rendered once per dataset"""
+        if Figure is None or len(power) == 0:
+            return None
+        
+        key = hashlib.sha1(np.ascontiguousarray(power, dtype=np.float64).tobytes() + ylabel.encode('utf-8')).hexdigest()
+        png = self.chart_cache.get(key)
+        if png is None:
+            fig = Figure(figsize=(7, 2.5), dpi=100)
+            ax = fig.subplots()
+            ax.plot(np.arange(len(power)), power, color='#1f77b4', linewidth=0.8 if len(power) > 200 else 1.5)
+            ax.set_ylabel(ylabel)
+            ax.grid(alpha=0.3)
+            fig.tight_layout()
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format='png')
+            png = buffer.getvalue()
+            
+            if len(self.chart_cache) >= CHART_CACHE_SIZE:
+                self.chart_cache.pop(next(iter(self.chart_cache)))
+            self.chart_cache[key] = png
+        
+        return Image(io.BytesIO(png), width=PDF_TABLE_WIDTH, height=PDF_TABLE_WIDTH * 2.5 / 7)
@@ -0,0 +1,119 @@
+"""
+Compact response encoding for prediction series
+
+Clients opt in with ``?format=columnar`` / ``?format=float32`` (or the
+``X-Response-Format`` header). Series of ``{'hour': h, 'power': p}`` rows are
+sent as parallel arrays, or with numeric columns packed as base64 float32,
+encoded with orjson and compressed according to ``Accept-Encoding``.
+"""
+
+import base64
+import gzip
+import json
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Prediction fields holding lists of per-period rows
+SERIES_KEYS = ('hourly_predictions', 'daily_predictions', 'daily_totals')
+
+# Integer index columns within a series; other numeric columns are values
+INDEX_COLUMNS = ('hour', 'day')
+
+# Response fields holding a prediction dict
+PREDICTION_KEYS = ('prediction', 'optimal_prediction')
+
+FORMATS = ('columnar', 'float32')
+FORMAT_HEADER = 'X-Response-Format'
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+
+def requested_format(args, headers):
+    """Return the compact format asked for by a request, or None for the default"""
+    fmt = args.get('format') or headers.get(FORMAT_HEADER)
+    return fmt if fmt in FORMATS else None
+
+
+def columnarize_series(rows, encoding='columnar'):
+    """Turn a list of row dicts into parallel column arrays"""
+    if not rows:
+        return {'length': 0, 'columns': {}}
+
+    n = len(rows)
+    columns = {}
+    for name, sample in rows[0].items():
+        if isinstance(sample, str):
+            columns[name] = [row[name] for row in rows]
+            continue
+
+        values = np.fromiter((row[name] for row in rows), dtype=np.float64, count=n)
+        if name in INDEX_COLUMNS:
+            columns[name] = values.astype(np.int64).tolist()
+        elif encoding == 'float32':
+            columns[name] = {
+                'dtype': 'float32',
+                'data': base64.b64encode(values.astype('<f4').tobytes()).decode('ascii')
+            }
+        else:
+            columns[name] = values.tolist()
+
+    return {'length': n, 'columns': columns}
+
+
+def columnarize(payload, encoding='columnar'):
+    """Return a copy of an /api/predict payload with its series in columnar form"""
+    result = dict(payload)
+    for key in PREDICTION_KEYS:
+        prediction = payload.get(key)
+        if not isinstance(prediction, dict):
+            continue
+
+        prediction = dict(prediction)
+        for series_key in SERIES_KEYS:
+            if series_key in prediction:
+                prediction[series_key] = columnarize_series(prediction[series_key], encoding)
+        result[key] = prediction
+
+    result['format'] = encoding
+    return result
+
+
+def encode_json(obj):
+    """Serialize to compact JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def compress(body, accept_encoding):
+    """Compress a body with the best encoding the client accepts"""
+    if len(body) < MIN_COMPRESS_BYTES or not accept_encoding:
+        return body, None
+
+    accepted = {part.split(';')[0].strip() for part in accept_encoding.lower().split(',')}
+    if brotli is not None and 'br' in accepted:
+        return brotli.compress(body, quality=4), 'br'
+    if 'gzip' in accepted:
+        return gzip.compress(body, compresslevel=1), 'gzip'
+    return body, None
+
+
+def encode_response(payload, fmt, accept_encoding):
+    """Build the body and headers of a compact prediction response"""
+    body = encode_json(columnarize(payload, fmt))
+    body, encoding = compress(body, accept_encoding)
+
+    headers = {'Vary': 'Accept-Encoding, ' + FORMAT_HEADER}
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return body, headers
@@ -0,0 +1,269 @@
+"""
+Production ASGI server for the Solar Power Prediction Platform
+
+The API endpoints run as coroutines: weather and geocoding calls are
+non-blocking HTTP requests on a shared connection pool, and CPU-bound
+inference and report generation are offloaded to a sized thread pool. The
+HTML pages and static files are still served by the Flask app, mounted
+through a WSGI adapter.
+
+Usage:
+    python server.py --port 8080 --workers 2
+    uvicorn server:asgi_app --host 0.0.0.0 --port 8080
+"""
+
+import argparse
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import wraps
+
+import httpx
+import uvicorn
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+
+from admission import AsyncAdmissionController, Overloaded, TIMEOUT_HEADER
+from response_format import requested_format, encode_response
+from http_cache import weather_cache_headers, prediction_cache_headers, not_modified
+from app import (
+    app as flask_app,
+    weather_provider,
+    predictor_for,
+    prediction_history,
+    validate_prediction_request,
+    run_prediction,
+    build_report,
+    NOMINATIM_DOMAIN,
+    NOMINATIM_SCHEME
+)
+
+# Threads for CPU-bound work (model inference, report generation)
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', os.cpu_count() or 4))
+
+# Upstream connection pool shared by all in-flight requests
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv('UPSTREAM_MAX_CONNECTIONS', 500))
+UPSTREAM_TIMEOUT = float(os.getenv('UPSTREAM_TIMEOUT', 10))
+
+executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix='inference')
+
+# Per-endpoint concurrency limits and bounded queues
+predict_admission = AsyncAdmissionController.for_endpoint('predict')
+report_admission = AsyncAdmissionController.for_endpoint('report')
+
+
+async def run_in_executor(func, *args):
+    """Run a blocking function on the inference pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+
+async def read_json(request):
+    """Parse a JSON request body, returning None when it is missing or invalid"""
+    try:
+        return await request.json()
+    except Exception:
+        return None
+
+
+def admission_controlled(controller):
+    """Run an endpoint under an admission controller; request.state.degraded flags a deep queue"""
+    def decorator(endpoint):
+        @wraps(endpoint)
+        async def wrapper(request):
+            deadline = controller.deadline(request.headers.get(TIMEOUT_HEADER))
+            try:
+                async with controller.admit(deadline) as ticket:
+                    request.state.degraded = ticket.degraded
+                    return await endpoint(request)
+            except Overloaded as e:
+                return JSONResponse(
+                    {'success': False, 'error': str(e)},
+                    status_code=503,
+                    headers={'Retry-After': str(e.retry_after)}
+                )
+        return wrapper
+    return decorator
+
+
+@admission_controlled(predict_admission)
+async def predict_solar_power(request):
+    try:
+        data = await read_json(request)
+
+        # Validate required parameters
+        error = validate_prediction_request(data)
+        if error:
+            return JSONResponse({'success': False, 'error': error}, status_code=400)
+
+        location = data['location']
+        client = request.app.state.http
+        degraded = request.state.degraded
+        weather_data = None
+        hourly_forecast = None
+
+        if data.get('prediction_type', 'daily') == 'forecast':
+            if degraded:
+                hourly_forecast = weather_provider.get_degraded_hourly_forecast(location['latitude'], location['longitude'])
+            else:
+                hourly_forecast = await weather_provider.get_hourly_forecast_async(
+                    location['latitude'],
+                    location['longitude'],
+                    client
+                )
+        elif degraded:
+            # Overloaded: skip the upstream weather calls
+            weather_data = weather_provider.get_degraded_weather_data(location['latitude'], location['longitude'])
+        else:
+            weather_data = await weather_provider.get_weather_data_async(
+                location['latitude'],
+                location['longitude'],
+                client
+            )
+
+        # Opt-in compact encoding of the prediction series
+        fmt = requested_format(request.query_params, request.headers)
+
+        # Validators from the weather snapshot and model; a match skips inference.
+        # The predictor is resolved once, off the event loop, since a regional
+        # model may still have to be loaded or trained.
+        predictor = await run_in_executor(predictor_for, location)
+        cache = None
+        if weather_data is not None and not degraded:
+            cache = prediction_cache_headers(weather_provider, data, weather_data, predictor.model_version, fmt)
+            if cache and not_modified(request.headers, cache):
+                return Response(status_code=304, headers=cache)
+
+        result = await run_in_executor(run_prediction, data, weather_data, hourly_forecast, predictor)
+        result['degraded'] = degraded
+        prediction_history.record(data, result, result['model_version'])
+
+        if fmt:
+            body, headers = await run_in_executor(
+                encode_response, result, fmt, request.headers.get('Accept-Encoding')
+            )
+            headers.update(cache or {})
+            return Response(body, media_type='application/json', headers=headers)
+
+        return JSONResponse(result, headers=cache)
+
+    except Exception as e:
+        print(f"Prediction error: {str(e)}")
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+
+
+async def get_history(request):
+    try:
+        params = request.query_params
+        rollups = await run_in_executor(
+            prediction_history.rollups,
+            params.get('period', 'daily'),
+            params.get('site'),
+            params.get('model_version'),
+            params.get('start'),
+            params.get('end'),
+            params.get('prediction_type', 'daily')
+        )
+        return JSONResponse({'success': True, 'data': rollups})
+    except ValueError as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+
+
+async def get_weather(request):
+    try:
+        lat = float(request.path_params['lat'])
+        lon = float(request.path_params['lon'])
+        weather_data = await weather_provider.get_weather_data_async(lat, lon, request.app.state.http)
+
+        cache = weather_cache_headers(weather_provider, lat, lon, weather_data)
+        if cache and not_modified(request.headers, cache):
+            return Response(status_code=304, headers=cache)
+
+        return JSONResponse({'success': True, 'data': weather_data}, headers=cache)
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+
+
+async def geocode_location(request):
+    try:
+        response = await request.app.state.http.get(
+            f"{NOMINATIM_SCHEME}://{NOMINATIM_DOMAIN}/search",
+            params={'q': request.path_params['location'], 'format': 'json', 'limit': 1},
+            headers={'User-Agent': 'solar_predictor'}
+        )
+        response.raise_for_status()
+        results = response.json()
+
+        if results:
+            return JSONResponse({
+                'success': True,
+                'latitude': float(results[0]['lat']),
+                'longitude': float(results[0]['lon']),
+                'address': results[0]['display_name']
+            })
+        else:
+            return JSONResponse({'success': False, 'error': 'Location not found'}, status_code=404)
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+
+
+@admission_controlled(report_admission)
+async def generate_report(request):
+    try:
+        data = await read_json(request)
+        report_path = await run_in_executor(build_report, data)
+
+        return JSONResponse({
+            'success': True,
+            'report_path': report_path
+        })
+
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    limits = httpx.Limits(
+        max_connections=UPSTREAM_MAX_CONNECTIONS,
+        max_keepalive_connections=UPSTREAM_MAX_CONNECTIONS // 5
+    )
+    async with httpx.AsyncClient(limits=limits, timeout=UPSTREAM_TIMEOUT) as client:
+        app.state.http = client
+        yield
+
+
+asgi_app = Starlette(
+    routes=[
+        Route('/api/predict', predict_solar_power, methods=['POST']),
+        Route('/api/history', get_history),
+        Route('/api/weather/{lat}/{lon}', get_weather),
+        Route('/api/geocode/{location}', geocode_location),
+        Route('/api/report', generate_report, methods=['POST']),
+        # Pages and static files are served by the Flask app
+        Mount('/', app=WSGIMiddleware(flask_app))
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the production ASGI server')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', 1)))
+    args = parser.parse_args()
+
+    uvicorn.run('server:asgi_app', host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,11 +6,15 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 import os
+import copy
+import threading
+import time
 from datetime import datetime, timedelta
 import math
+from model_tuning import SuccessiveHalvingSearch
 
 class SolarPowerPredictor:
-    def __init__(self):
+    def __init__(self, model_dir='models', latitude_range=(-60, 60), training_samples=10000):
         self.model = None
         self.scaler = StandardScaler()
         self.feature_columns = [
@@ -18,24 +22,44 @@ class SolarPowerPredictor:
             'solar_irradiance', 'temperature', 'humidity', 'wind_speed', 'cloud_cover',
             'day_of_year', 'hour_of_day', 'sun_elevation', 'sun_azimuth'
         ]
-        self.model_path = 'models/solar_power_model.pkl'
-        self.scaler_path = 'models/scaler.pkl'
+        self.model_dir = model_dir
+        self.model_path = os.path.join(model_dir, 'solar_power_model.pkl')
+        self.scaler_path = os.path.join(model_dir, 'scaler.pkl')
+        self.metrics_path = os.path.join(model_dir, 'model_metrics.pkl')
+        self.labelled_path = os.path.join(model_dir, 'labelled_data.pkl')
+        
+        # Latitudes and size of the synthetic training data
+        self.latitude_range = latitude_range
+        self.training_samples = training_samples
+        
+        # Incremental update state
+        self.model_metrics = {}
+        self.update_history = []
+        self.labelled_data = pd.DataFrame(columns=self.feature_columns + ['solar_power'])
+        self.max_labelled_rows = 200000  # most recent labelled rows kept for full retrains
+        self.drift_threshold = 0.5  # relative MAE increase that forces a full retrain
+        
+        # Rows scored vs. rows short-circuited as physically zero (night, no irradiance)
+        self.inference_stats = {'rows_total': 0, 'rows_skipped': 0}
+        self.stats_lock = threading.Lock()
+        self.tuning_result = None
         
         # Create models directory if it doesn't exist
-        os.makedirs('models', exist_ok=True)
+        os.makedirs(model_dir, exist_ok=True)
         
         # Load or train model
         self.load_or_train_model()
     
-    def generate_synthetic_data(self, n_samples=10000):
+    def generate_synthetic_data(self, n_samples=10000, latitude_range=None):
         """Generate synthetic training data for the solar power prediction model"""
         np.random.seed(42)
+        lat_min, lat_max = latitude_range or self.latitude_range
         
         data = []
         
         for _ in range(n_samples):
             # Geographic parameters
-            latitude = np.random.uniform(-60, 60)  # Most populated areas
+            latitude = np.random.uniform(lat_min, lat_max)  # Most populated areas by default
             longitude = np.random.uniform(-180, 180)
             
             # Panel configuration
@@ -112,6 +136,24 @@ class SolarPowerPredictor:
         
         return math.degrees(elevation), math.degrees(azimuth)
     
+    def calculate_sun_positions(self, latitude, day_of_year, hour):
+        """Vectorized sun elevation and azimuth angles for arrays of inputs"""
+        lat_rad = np.radians(latitude)
+        declination = 23.45 * np.sin(np.radians(360 * (284 + np.asarray(day_of_year)) / 365))
+        decl_rad = np.radians(declination)
+        hour_rad = np.radians(15 * (np.asarray(hour) - 12))
+        
+        elevation = np.arcsin(
+            np.sin(decl_rad) * np.sin(lat_rad) +
+            np.cos(decl_rad) * np.cos(lat_rad) * np.cos(hour_rad)
+        )
+        azimuth = np.arctan2(
+            np.sin(hour_rad),
+            np.cos(hour_rad) * np.sin(lat_rad) - np.tan(decl_rad) * np.cos(lat_rad)
+        )
+        
+        return np.degrees(elevation), np.degrees(azimuth)
+    
     def calculate_solar_power(self, irradiance, area, tilt, azimuth, sun_elevation, sun_azimuth, temperature, cloud_cover):
         """Calculate solar power output using a simplified model"""
         if sun_elevation <= 0:
@@ -146,6 +188,11 @@ class SolarPowerPredictor:
             try:
                 self.model = joblib.load(self.model_path)
                 self.scaler = joblib.load(self.scaler_path)
+                if os.path.exists(self.metrics_path):
+                    self.model_metrics = joblib.load(self.metrics_path)
+                if os.path.exists(self.labelled_path):
+                    self.labelled_data = joblib.load(self.labelled_path)
+                self.running_scaler = copy.deepcopy(self.scaler)
                 print("Model loaded successfully")
                 print(f"Model type: {type(self.model)}")
                 print(f"Scaler type: {type(self.scaler)}")
@@ -157,10 +204,18 @@ class SolarPowerPredictor:
             print("No existing model found, training new one...")
             self.train_model()
     
-    def train_model(self):
-        """Train the solar power prediction model"""
+    def train_model(self, extra_data=None, tune=False, n_jobs=None, save=True):
+        """Train the solar power prediction model.
+        
+        With ``tune`` the candidates' hyperparameters are chosen by a parallel
+        successive-halving search (see model_tuning) instead of the defaults.
+        """
         print("Generating training data...")
-        df = self.generate_synthetic_data()
+        df = self.generate_synthetic_data(n_samples=self.training_samples)
+        
+        # Include real labelled measurements when available
+        if extra_data is not None and len(extra_data) > 0:
+            df = pd.concat([df, extra_data[self.feature_columns + ['solar_power']]], ignore_index=True)
         
         # Prepare features and target
         X = df[self.feature_columns]
@@ -174,17 +229,26 @@ class SolarPowerPredictor:
         X_test_scaled = self.scaler.transform(X_test)
         
         # Train model (using ensemble of models)
-        models = {
-            'rf': RandomForestRegressor(n_estimators=100, random_state=42),
-            'gb': GradientBoostingRegressor(n_estimators=100, random_state=42)
-        }
+        if tune:
+            print("Tuning hyperparameters...")
+            search = SuccessiveHalvingSearch(n_jobs=n_jobs)
+            result = search.run(X_train.to_numpy(), y_train.to_numpy())
+            print(f"Best candidate: {result['name']} {result['params']} "
+                  f"(CV R²: {result['best']['r2']:.4f}, {result['parallel_seconds']:.1f}s)")
+            self.tuning_result = result
+            models = {result['name']: result['estimator']}
+        else:
+            models = {
+                'rf': RandomForestRegressor(n_estimators=100, random_state=42),
+                'gb': GradientBoostingRegressor(n_estimators=100, random_state=42)
+            }
         
         best_model = None
         best_score = -float('inf')
         
         for name, model in models.items():
             model.fit(X_train_scaled, y_train)
-            y_pred = model.predict(X_test_scaled)
+            y_pred = self.score_scaled(X_test_scaled, model)
             score = r2_score(y_test, y_pred)
             
             if score > best_score:
@@ -194,7 +258,7 @@ class SolarPowerPredictor:
         self.model = best_model
         
         # Evaluate model
-        y_pred = self.model.predict(X_test_scaled)
+        y_pred = self.score_scaled(X_test_scaled)
         mae = mean_absolute_error(y_test, y_pred)
         mse = mean_squared_error(y_test, y_pred)
         r2 = r2_score(y_test, y_pred)
@@ -204,9 +268,117 @@ class SolarPowerPredictor:
         print(f"MSE: {mse:.2f}")
         print(f"R²: {r2:.4f}")
         
-        # Save model and scaler
+        self.model_metrics = {
+            'mae': mae,
+            'mse': mse,
+            'r2': r2,
+            'n_samples': len(df),
+            'trained_at': datetime.now().isoformat()
+        }
+        self.running_scaler = copy.deepcopy(self.scaler)
+        
+        # Save model, scaler and metrics
+        if save:
+            self.save_model()
+    
+    @property
+    def model_version(self):
+        """Identifier of the current model: training time plus estimator count.
+        
+        Changes on every retrain and incremental update, so stored predictions
+        and cached responses can be tied to the model that produced them.
+        """
+        trained_at = self.model_metrics.get('trained_at')
+        if trained_at:
+            trained_at = datetime.fromisoformat(trained_at)
+        elif os.path.exists(self.model_path):
+            trained_at = datetime.fromtimestamp(os.path.getmtime(self.model_path))
+        else:
+            return 'untrained'
+        return f"{trained_at:%Y%m%d%H%M%S}-n{getattr(self.model, 'n_estimators', 0)}"
+    
+    def save_model(self):
+        """Persist the model, scaler, training metrics and labelled measurements"""
         joblib.dump(self.model, self.model_path)
         joblib.dump(self.scaler, self.scaler_path)
+        joblib.dump(self.model_metrics, self.metrics_path)
+        if len(self.labelled_data):
+            joblib.dump(self.labelled_data, self.labelled_path)
+    
+    def update_model(self, labelled_data, n_new_estimators=10, drift_threshold=None, save=True):
+        """Incrementally update the model with a new batch of labelled measurements.
+        
+        ``labelled_data`` is a DataFrame holding the feature columns and a
+        ``solar_power`` target. The batch is first scored with the current model
+        to measure validation drift against the training MAE. Below the drift
+        threshold extra trees (random forest) or boosting rounds (gradient
+        boosting) are warm-started on the batch; above it the model is fully
+        retrained on synthetic data plus the labelled rows seen so far (the most
+        recent ``max_labelled_rows``, persisted with the model). With
+        ``save=False`` nothing is written to disk in either case.
+        """
+        if self.model is None:
+            raise ValueError("Model not trained or loaded")
+        
+        missing = [c for c in self.feature_columns + ['solar_power'] if c not in labelled_data.columns]
+        if missing:
+            raise ValueError(f"Labelled data is missing columns: {', '.join(missing)}")
+        
+        if drift_threshold is None:
+            drift_threshold = self.drift_threshold
+        
+        start = time.perf_counter()
+        X = labelled_data[self.feature_columns]
+        y = labelled_data['solar_power'].to_numpy()
+        
+        # Keep the most recent labelled rows for full retrains
+        batch = labelled_data[self.feature_columns + ['solar_power']]
+        if len(self.labelled_data):
+            batch = pd.concat([self.labelled_data, batch], ignore_index=True)
+        self.labelled_data = batch.iloc[-self.max_labelled_rows:].reset_index(drop=True)
+        
+        # Validation drift: how much worse the current model does on unseen data
+        X_scaled = self.scaler.transform(X)
+        mae_before = mean_absolute_error(y, self.score_scaled(X_scaled))
+        baseline_mae = self.model_metrics.get('mae')
+        if not baseline_mae:
+            baseline_mae = mae_before
+            self.model_metrics['mae'] = baseline_mae
+        drift = (mae_before - baseline_mae) / max(baseline_mae, 1e-9)
+        
+        # Track feature statistics on the fly. The model's own scaler stays fixed
+        # between retrains because the existing trees split on scaled values.
+        self.running_scaler.partial_fit(X)
+        feature_shift = np.max(np.abs(self.running_scaler.mean_ - self.scaler.mean_) / self.scaler.scale_)
+        
+        if drift > drift_threshold:
+            print(f"Validation drift {drift:.2f} exceeds {drift_threshold:.2f}, retraining...")
+            mode = 'full_retrain'
+            self.train_model(extra_data=self.labelled_data, save=save)
+            X_scaled = self.scaler.transform(X)
+        else:
+            mode = 'incremental'
+            self.model.set_params(
+                warm_start=True,
+                n_estimators=self.model.n_estimators + n_new_estimators
+            )
+            self.model.fit(X_scaled, y)
+            if save:
+                self.save_model()
+        
+        mae_after = mean_absolute_error(y, self.score_scaled(X_scaled))
+        update = {
+            'mode': mode,
+            'rows': len(labelled_data),
+            'seconds': time.perf_counter() - start,
+            'drift': drift,
+            'feature_shift': float(feature_shift),
+            'mae_before': mae_before,
+            'mae_after': mae_after,
+            'n_estimators': self.model.n_estimators
+        }
+        self.update_history.append(update)
+        return update
     
     def prepare_features(self, latitude, longitude, panel_area, tilt_angle, azimuth_angle, weather_data):
         """Prepare features for prediction"""
@@ -241,13 +413,127 @@ class SolarPowerPredictor:
         features_df = pd.DataFrame(features_data)
         return self.scaler.transform(features_df)
     
+    def predict_batch(self, features_df):
+        """Score a DataFrame of unscaled feature rows in one inference call"""
+        if self.model is None:
+            raise ValueError("Model not trained or loaded")
+        
+        return self.predict_scaled(self.scaler.transform(features_df[self.feature_columns]))
+    
+    def physically_zero_mask(self, features_scaled):
+        """Rows that must produce zero power: sun below the horizon or no irradiance.
+        
+        The check runs on scaled features, comparing against the scaled
+        position of zero so no inverse transform is needed.
+        """
+        elevation_idx = self.feature_columns.index('sun_elevation')
+        irradiance_idx = self.feature_columns.index('solar_irradiance')
+        zero = (0 - self.scaler.mean_) / self.scaler.scale_
+        
+        return ((features_scaled[:, elevation_idx] <= zero[elevation_idx]) |
+                (features_scaled[:, irradiance_idx] <= zero[irradiance_idx]))
+    
+    def _score(self, features_scaled, model):
+        features_scaled = np.asarray(features_scaled)
+        zero_rows = self.physically_zero_mask(features_scaled)
+        active = ~zero_rows
+        
+        predictions = np.zeros(len(features_scaled))
+        if active.any():
+            predictions[active] = model.predict(features_scaled[active])
+        return predictions, zero_rows
+    
+    def score_scaled(self, features_scaled, model=None):
+        """Model output for scaled feature rows, with physically-zero rows set to zero.
+        
+        The rule used for serving; training and update metrics are measured
+        with it too. ``model`` defaults to the current model.
+        """
+        return self._score(features_scaled, self.model if model is None else model)[0]
+    
+    def predict_scaled(self, features_scaled):
+        """Serve predictions for scaled feature rows, counting skipped rows.
+        
+        Called concurrently from request threads, so the counters are updated
+        under a lock.
+        """
+        predictions, zero_rows = self._score(features_scaled, self.model)
+        with self.stats_lock:
+            self.inference_stats['rows_total'] += len(predictions)
+            self.inference_stats['rows_skipped'] += int(zero_rows.sum())
+        return predictions
+    
+    def predict_forecast(self, latitude, longitude, panel_area, tilt_angle, azimuth_angle, hourly_forecast):
+        """Predict hourly power over a multi-day hourly weather forecast.
+        
+        ``hourly_forecast`` is the DataFrame returned by
+        ``WeatherDataProvider.get_hourly_forecast``; all hours are scored in a
+        single batched inference call. Its UTC ``datetime`` labels the output,
+        while day of year, hour and sun geometry use local ``solar_time``.
+        ``peak_hour`` is the local solar hour of the peak (``peak_datetime``
+        its UTC label) and ``average_daily`` is the total per 24 hours.
+        """
+        timestamps = hourly_forecast['datetime']
+        solar_time = hourly_forecast['solar_time']
+        solar_hour = ((solar_time - solar_time.dt.normalize()) / pd.Timedelta(hours=1)).to_numpy()
+        n_hours = len(hourly_forecast)
+        
+        features_df = pd.DataFrame({
+            'latitude': np.full(n_hours, latitude, dtype=float),
+            'longitude': np.full(n_hours, longitude, dtype=float),
+            'panel_area': np.full(n_hours, panel_area, dtype=float),
+            'tilt_angle': np.full(n_hours, tilt_angle, dtype=float),
+            'azimuth_angle': np.full(n_hours, azimuth_angle, dtype=float),
+            'solar_irradiance': hourly_forecast['solar_irradiance'].to_numpy(),
+            'temperature': hourly_forecast['temperature'].to_numpy(),
+            'humidity': hourly_forecast['humidity'].to_numpy(),
+            'wind_speed': hourly_forecast['wind_speed'].to_numpy(),
+            'cloud_cover': hourly_forecast['cloud_cover'].to_numpy(),
+            'day_of_year': solar_time.dt.dayofyear.to_numpy(),
+            'hour_of_day': solar_time.dt.hour.to_numpy()
+        })
+        features_df['sun_elevation'], features_df['sun_azimuth'] = self.calculate_sun_positions(
+            features_df['latitude'].to_numpy(),
+            features_df['day_of_year'].to_numpy(),
+            solar_hour
+        )
+        
+        power = np.maximum(0, self.predict_batch(features_df))
+        
+        labels = timestamps.dt.strftime('%Y-%m-%d %H:%M').tolist()
+        hourly_predictions = [
+            {'hour': i, 'datetime': labels[i], 'power': float(power[i])}
+            for i in range(n_hours)
+        ]
+        
+        # Days follow local solar time, so a site's daylight is never split
+        # across two UTC dates; the first and last days may be partial.
+        dates = solar_time.dt.strftime('%Y-%m-%d')
+        daily_totals = pd.Series(power).groupby(dates.to_numpy(), sort=True).sum()
+        daily_predictions = [
+            {'day': i + 1, 'date': date, 'power': float(total)}
+            for i, (date, total) in enumerate(daily_totals.items())
+        ]
+        
+        peak_index = int(np.argmax(power)) if n_hours else 0
+        
+        return {
+            'total_power': float(power.sum()),
+            'hourly_predictions': hourly_predictions,
+            'daily_totals': daily_predictions,
+            'peak_power': float(power[peak_index]) if n_hours else 0,
+            'peak_hour': int(features_df['hour_of_day'].iloc[peak_index]) if n_hours else 0,
+            'peak_datetime': labels[peak_index] if n_hours else None,
+            'average_daily': float(power.sum()) / (n_hours / 24) if n_hours else 0
+        }
+    
     def predict(self, features, prediction_type='daily'):
         """Make solar power prediction"""
         if self.model is None:
             raise ValueError("Model not trained or loaded")
         
         # Make prediction
-        power_prediction = self.model.predict(features)[0]
+        power_prediction = self.predict_scaled(features)[0]
         
         if prediction_type == 'daily':
             # Generate hourly predictions for the day
@@ -11,6 +11,28 @@ class SolarAnalyticsApp {
         this.initializeCharts();
         this.populateHistoricalTable();
         this.animateMetrics();
+        this.loadStoredHistory();
+    }
+
+    async loadStoredHistory() {
+        const history = await this.fetchHistory('daily');
+        if (history.length > 0) {
+            this.charts.powerTrend.data.labels = history.map(r => r.period);
+            this.charts.powerTrend.data.datasets[0].data = history.map(r => r.total_power);
+            this.charts.powerTrend.update();
+        }
+    }
+
+    async fetchHistory(period) {
+        // Pre-aggregated prediction history stored by the server
+        try {
+            // Totals of one prediction horizon only: daily predictions
+            const response = await fetch(`/api/history?period=${period}&prediction_type=daily`);
+            const result = await response.json();
+            return result.success ? result.data : [];
+        } catch (error) {
+            return [];
+        }
     }
 
     generateHistoricalData() {
@@ -240,17 +262,21 @@ class SolarAnalyticsApp {
         });
     }
 
-    switchChartPeriod(period) {
+    async switchChartPeriod(period) {
         // Update button states
         document.querySelectorAll('[data-period]').forEach(btn => {
             btn.classList.remove('active');
         });
         document.querySelector(`[data-period="${period}"]`).classList.add('active');
 
-        // Update chart data based on period
+        // Update chart data based on period, preferring stored history
         let labels, data;
+        const history = period === 'weekly' ? [] : await this.fetchHistory(period);
         
-        switch(period) {
+        if (history.length > 0) {
+            labels = history.map(r => r.period);
+            data = history.map(r => r.total_power);
+        } else switch(period) {
             case 'daily':
                 labels = this.historicalData.slice(-7).map(d => {
                     const date = new Date(d.date);
@@ -3,6 +3,7 @@ class SolarPredictionApp {
     constructor() {
         this.chart = null;
         this.currentData = null;
+        this.predictionCache = new Map(); // request body -> {etag, data}
         this.predefinedLocations = this.getPredefinedLocations();
         this.initializeApp();
     }
@@ -250,26 +251,44 @@ class SolarPredictionApp {
         this.hideError();
 
         try {
+            const body = JSON.stringify({
+                location: {
+                    latitude: latitude,
+                    longitude: longitude
+                },
+                panel_config: {
+                    area: panelArea,
+                    tilt: tiltAngle,
+                    azimuth: azimuthAngle
+                },
+                prediction_type: predictionType
+            });
+            const headers = {
+                'Content-Type': 'application/json',
+            };
+
+            // Revalidate a repeat request instead of recomputing it
+            const cached = this.predictionCache.get(body);
+            if (cached) {
+                headers['If-None-Match'] = cached.etag;
+            }
+
             const response = await fetch('/api/predict', {
                 method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    location: {
-                        latitude: latitude,
-                        longitude: longitude
-                    },
-                    panel_config: {
-                        area: panelArea,
-                        tilt: tiltAngle,
-                        azimuth: azimuthAngle
-                    },
-                    prediction_type: predictionType
-                })
+                headers: headers,
+                body: body
             });
 
-            const data = await response.json();
+            let data;
+            if (response.status === 304 && cached) {
+                data = cached.data;
+            } else {
+                data = await response.json();
+                const etag = response.headers.get('ETag');
+                if (data.success && etag) {
+                    this.predictionCache.set(body, { etag: etag, data: data });
+                }
+            }
 
             if (data.success) {
                 this.currentData = data;
@@ -377,7 +396,7 @@ class SolarPredictionApp {
         
         if (prediction.hourly_predictions) {
             // Daily chart
-            labels = prediction.hourly_predictions.map(h => `${h.hour}:00`);
+            labels = prediction.hourly_predictions.map(h => h.datetime || `${h.hour}:00`);
             data = prediction.hourly_predictions.map(h => h.power);
             title = 'Hourly Power Generation (W)';
         } else if (prediction.daily_predictions) {
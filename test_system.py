@@ -5,6 +5,11 @@ Test script for the Solar Power Prediction Platform
 
 import sys
 import os
+import tempfile
+
+# Keep test predictions out of the real history store; app opens it at import
+TEST_DATA_DIR = tempfile.TemporaryDirectory(prefix='solar_test_')
+os.environ['HISTORY_DB'] = os.path.join(TEST_DATA_DIR.name, 'predictions.db')
 
 def test_imports():
     """Test if all required modules can be imported"""
@@ -78,6 +83,482 @@ def test_solar_predictor():
         print(f"✗ Solar prediction test failed: {e}")
         return False
 
+def test_incremental_update():
+    """Test incremental model updates from a labelled batch"""
+    print("\nTesting Incremental Model Update...")
+    
+    try:
+        from solar_prediction import SolarPowerPredictor
+        predictor = SolarPowerPredictor()
+        
+        batch = predictor.generate_synthetic_data(n_samples=200)
+        n_estimators = predictor.model.n_estimators
+        update = predictor.update_model(batch, n_new_estimators=5, save=False)
+        
+        assert update['mode'] == 'incremental'
+        assert predictor.model.n_estimators == n_estimators + 5
+        print(f"✓ Incremental update: {update['rows']} rows in {update['seconds']:.2f}s, drift={update['drift']:.2f}")
+        
+        # A shifted target drifts past the threshold and forces a full retrain
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            small = SolarPowerPredictor(model_dir=tmp, training_samples=500)
+            mtime = os.path.getmtime(small.model_path)
+            shifted = batch.assign(solar_power=batch['solar_power'] * 3 + 500)
+            update = small.update_model(shifted, save=False)
+            assert update['mode'] == 'full_retrain' and len(small.labelled_data) == len(batch)
+            assert os.path.getmtime(small.model_path) == mtime
+            
+            small.update_model(shifted)
+            assert len(SolarPowerPredictor(model_dir=tmp).labelled_data) == 2 * len(batch)
+        print(f"✓ Drift {update['drift']:.2f} triggered a full retrain")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Incremental update test failed: {e}")
+        return False
+
+def test_backtester():
+    """Test chunked backtesting against measured generation"""
+    print("\nTesting Backtester...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from solar_prediction import SolarPowerPredictor
+        from backtesting import Backtester
+        predictor = SolarPowerPredictor()
+        
+        hours = pd.date_range('2024-01-01', periods=24 * 60, freq='h')
+        measurements = pd.DataFrame({
+            'site_id': np.repeat(['site-a', 'site-b'], len(hours)),
+            'timestamp': np.tile(hours, 2),
+            'latitude': np.repeat([40.7, -33.9], len(hours)),
+            'longitude': np.repeat([-74.0, 151.2], len(hours)),
+            'panel_area': 10,
+            'tilt_angle': 30,
+            'azimuth_angle': 180,
+            'solar_irradiance': 600,
+            'temperature': 20,
+            'humidity': 50,
+            'wind_speed': 5,
+            'cloud_cover': np.tile(np.arange(len(hours)) % 100, 2),
+            'measured_power': 300
+        })
+        
+        results = Backtester(predictor, chunk_size=1000).run(measurements)
+        
+        assert results['rows'] == len(measurements)
+        assert list(results['by_site']['site_id']) == ['site-a', 'site-b']
+        assert len(results['by_hour']) == 24 and len(results['by_cloud_band']) == 5
+        print(f"✓ Backtest: MAE={results['overall']['mae']:.2f}, {results['rows_per_second']:.0f} rows/s")
+        
+        # Night and zero-irradiance rows are short-circuited to zero
+        night = measurements.iloc[:24].copy()
+        night['solar_irradiance'] = [0] * 12 + [600] * 12
+        features = Backtester(predictor).prepare_features(night, Backtester(predictor).solar_times(night))
+        skipped_before = predictor.inference_stats['rows_skipped']
+        power = predictor.predict_batch(features)
+        zero_rows = (features['sun_elevation'] <= 0) | (features['solar_irradiance'] <= 0)
+        assert (power[zero_rows.to_numpy()] == 0).all()
+        assert predictor.inference_stats['rows_skipped'] - skipped_before == zero_rows.sum()
+        print(f"✓ Skipped {zero_rows.sum()} of {len(features)} physically-zero rows")
+        
+        # Counters stay exact when requests score concurrently
+        from concurrent.futures import ThreadPoolExecutor
+        total_before = predictor.inference_stats['rows_total']
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: predictor.predict_batch(features), range(64)))
+        assert predictor.inference_stats['rows_total'] - total_before == 64 * len(features)
+        
+        # UTC timestamps are shifted to solar time: 02:00 UTC is about noon in Sydney
+        sydney = measurements.iloc[len(hours):len(hours) + 24].copy()
+        sydney['timestamp'] = pd.date_range('2024-01-01 00:00', periods=24, freq='h', tz='UTC')
+        backtester = Backtester(predictor)
+        solar_time = backtester.solar_times(sydney)
+        assert solar_time.dt.hour.iloc[2] == 12
+        assert backtester.prepare_features(sydney, solar_time)['sun_elevation'].iloc[2] > 60
+        naive = Backtester(predictor, utc=False).solar_times(sydney.assign(timestamp=hours[:24]))
+        assert Backtester(predictor).prepare_features(sydney, naive)['sun_elevation'].iloc[2] <= 0
+        assert list(backtester.run(sydney.iloc[2:3])['by_hour']['hour']) == [12]
+        
+        # Vectorized sun geometry must agree with the scalar version
+        elevation, azimuth = predictor.calculate_sun_positions(np.array([40.7]), np.array([172]), np.array([15]))
+        expected = predictor.calculate_sun_position(40.7, -74.0, 172, 15)
+        assert np.allclose([elevation[0], azimuth[0]], expected)
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Backtester test failed: {e}")
+        return False
+
+def test_forecast_prediction():
+    """Test hourly prediction over the 5-day forecast"""
+    print("\nTesting Forecast Prediction...")
+    
+    try:
+        import numpy as np
+        from solar_prediction import SolarPowerPredictor
+        from weather_api import WeatherDataProvider
+        predictor = SolarPowerPredictor()
+        weather = WeatherDataProvider()
+        
+        forecast = weather.generate_demo_forecast(n_entries=40)
+        hourly_forecast = weather.interpolate_hourly_forecast(forecast, 40.7128, -74.0060)
+        assert len(hourly_forecast) == 120
+        
+        # Forecast times are UTC: Sydney's irradiance peaks near 02:00 UTC, local solar noon
+        clear_sky = [
+            {'datetime': f"2026-06-0{1 + i // 8} {3 * (i % 8):02d}:00:00", 'temperature': 20,
+             'humidity': 50, 'wind_speed': 3, 'cloud_cover': 0}
+            for i in range(40)
+        ]
+        sydney = weather.interpolate_hourly_forecast(clear_sky, -33.8688, 151.2093)
+        peak_utc_hour = sydney.loc[sydney['solar_irradiance'].idxmax(), 'datetime'].hour
+        assert peak_utc_hour in (1, 2, 3), peak_utc_hour
+        assert sydney.loc[sydney['datetime'].dt.hour == 12, 'solar_irradiance'].max() == 0
+        
+        prediction = predictor.predict_forecast(40.7128, -74.0060, 10, 30, 180, hourly_forecast)
+        assert len(prediction['hourly_predictions']) == 120
+        assert np.isclose(prediction['average_daily'], prediction['total_power'] / 5)
+        assert 0 <= prediction['peak_hour'] < 24
+        
+        # Sydney's daylight falls in one local day, not across two UTC dates
+        sydney_prediction = predictor.predict_forecast(-33.8688, 151.2093, 10, 30, 0, sydney)
+        daylight = [d for d in sydney_prediction['daily_totals'] if d['power'] > 0]
+        assert sydney['solar_time'].iloc[0].strftime('%Y-%m-%d') == daylight[0]['date'] == '2026-06-01'
+        print(f"✓ 5-day forecast prediction: {prediction['total_power']:.2f} Wh over {len(prediction['daily_totals'])} days")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Forecast prediction test failed: {e}")
+        return False
+
+def test_model_registry():
+    """Test lazy loading, LRU eviction and per-row routing of regional models"""
+    print("\nTesting Model Registry...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from model_registry import ModelRegistry
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = ModelRegistry(model_dir=tmp, memory_budget_mb=0, training_samples=1000)
+            assert registry.region_for(40.7) == 'north_temperate' and registry.region_for(-33.9) == 'south_temperate'
+            
+            north = registry.get('north_temperate')
+            south = registry.get('south_temperate')
+            assert north.latitude_range == (18.5, 55) and registry.stats()['loaded'] == ['south_temperate']
+            
+            rows = north.generate_synthetic_data(n_samples=40, latitude_range=(-45, 45))
+            rows = rows[rows['latitude'].abs() > 25]
+            routed = registry.predict_batch(rows)
+            in_north = rows['latitude'].to_numpy() > 0
+            assert np.allclose(routed[in_north], registry.get('north_temperate').predict_batch(rows[in_north]))
+            
+            stats = registry.stats()
+            assert stats['misses'] >= 3 and stats['hits'] >= 1 and stats['evictions'] >= 2
+
+            # Concurrent first lookups share one load, which runs outside the lock
+            import threading
+            from concurrent.futures import ThreadPoolExecutor
+            loads, release = [], threading.Event()
+            def slow_load(region):
+                loads.append(region)
+                release.wait(5)
+                return north, 1, 0.0
+            registry._load = slow_load
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                futures = [pool.submit(registry.get, 'tropical') for _ in range(4)]
+                assert registry.get('north_temperate') is not None  # not blocked by the load
+                release.set()
+                assert all(f.result() is north for f in futures) and loads == ['tropical']
+        print(f"✓ Registry routed {len(rows)} rows, hit rate {stats['hit_rate']:.0%}, "
+              f"average load {stats['average_load_seconds']:.2f}s")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Model registry test failed: {e}")
+        return False
+
+def test_asgi_server():
+    """Test the async API endpoints of the production server"""
+    print("\nTesting ASGI Server...")
+    
+    try:
+        from starlette.testclient import TestClient
+        from server import asgi_app
+        
+        with TestClient(asgi_app) as client:
+            response = client.get('/api/weather/40.7128/-74.0060')
+            assert response.status_code == 200 and response.json()['success']
+            
+            response = client.post('/api/predict', json={
+                'location': {'latitude': 40.7128, 'longitude': -74.0060},
+                'panel_config': {'area': 10, 'tilt': 30, 'azimuth': 180},
+                'prediction_type': 'daily'
+            })
+            assert response.status_code == 200 and response.json()['success']
+            
+            response = client.post('/api/predict', json={})
+            assert response.status_code == 400
+            
+            response = client.get('/api/history?period=monthly')
+            assert response.status_code == 200 and response.json()['success']
+            assert client.get('/api/history?period=yearly').status_code == 400
+        print("✓ ASGI weather, prediction and history endpoints responded")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ ASGI server test failed: {e}")
+        return False
+
+def test_conditional_caching():
+    """Test ETag validators and 304 responses of the weather and prediction endpoints"""
+    print("\nTesting Conditional Caching...")
+    
+    try:
+        from starlette.testclient import TestClient
+        from app import app as flask_app
+        from server import asgi_app
+        
+        request = {
+            'location': {'latitude': 35.6762, 'longitude': 139.6503},
+            'panel_config': {'area': 12, 'tilt': 30, 'azimuth': 180},
+            'prediction_type': 'daily'
+        }
+        
+        flask_client = flask_app.test_client()
+        with TestClient(asgi_app) as asgi_client:
+            for client in (flask_client, asgi_client):
+                response = client.get('/api/weather/35.6762/139.6503')
+                etag = response.headers['ETag']
+                assert 'max-age=' in response.headers['Cache-Control'] and response.headers['Last-Modified']
+                assert client.get('/api/weather/35.6762/139.6503', headers={'If-None-Match': etag}).status_code == 304
+                
+                response = client.post('/api/predict', json=request)
+                etag = response.headers['ETag']
+                assert response.status_code == 200 and response.headers['Cache-Control'].startswith('private')
+                assert client.post('/api/predict', json=request, headers={'If-None-Match': etag}).status_code == 304
+                
+                changed = dict(request, panel_config={'area': 20, 'tilt': 30, 'azimuth': 180})
+                assert client.post('/api/predict', json=changed, headers={'If-None-Match': etag}).status_code == 200
+                
+                # Predictions revalidate by ETag only, so a retrain is never hidden by a date
+                assert 'Last-Modified' not in response.headers
+                future = {'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'}
+                assert client.post('/api/predict', json=request, headers=future).status_code == 200
+        
+        # No validators for data other than the unexpired snapshot it claims to be
+        import time
+        from weather_api import WeatherDataProvider
+        from http_cache import weather_cache_headers
+        provider = WeatherDataProvider()
+        snapshot = provider.cache_weather_data(10.0, 20.0, {'temperature': 20})
+        assert weather_cache_headers(provider, 10.0, 20.0, snapshot)
+        assert weather_cache_headers(provider, 10.0, 20.0, provider.get_demo_weather_data(10.0, 20.0)) is None
+        key = provider._cache_key(10.0, 20.0)
+        provider.cache[key] = (time.time() - provider.cache_ttl - 1, snapshot)
+        assert weather_cache_headers(provider, 10.0, 20.0, snapshot) is None
+        print("✓ Weather and prediction endpoints answered revalidation with 304")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Conditional caching test failed: {e}")
+        return False
+
+def test_prediction_history():
+    """Test batched history writes and daily/monthly rollups"""
+    print("\nTesting Prediction History...")
+    
+    try:
+        import tempfile
+        from datetime import datetime, timedelta, timezone
+        from prediction_history import PredictionHistory
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            history = PredictionHistory(os.path.join(tmp, 'history.db'), batch_size=50)
+            start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+            for i in range(600):
+                data = {
+                    'location': {'latitude': 40.71 if i % 2 else 51.5, 'longitude': -74.0},
+                    'panel_config': {'area': 10}
+                }
+                result = {
+                    'prediction': {'total_power': 10.0, 'peak_power': float(i % 7)},
+                    'optimal_prediction': {'total_power': 12.0}
+                }
+                history.record(data, result, 'v1' if i < 300 else 'v2', timestamp=start + timedelta(hours=i))
+            
+            # A 30-day total for the same site and day is rolled up separately
+            monthly_request = dict(data, prediction_type='monthly')
+            monthly_result = {'prediction': {'total_power': 900.0}, 'optimal_prediction': {'total_power': 950.0}}
+            history.record(monthly_request, monthly_result, 'v2', timestamp=start)
+            history.flush()
+            
+            daily = history.rollups('daily')
+            monthly = history.rollups('monthly')
+            assert history.stats['written'] == 601 and history.stats['batches'] >= 12
+            assert len(daily) == 25 and daily[0]['n_predictions'] == 24 and daily[0]['sites'] == 2
+            assert [m['period'] for m in monthly] == ['2026-01']
+            assert monthly[0]['total_power'] == 6000.0 and monthly[0]['peak_power'] == 6.0
+            assert sum(d['n_predictions'] for d in history.rollups('daily', model_version='v2')) == 300
+            assert sum(d['n_predictions'] for d in history.rollups('daily', site='51.50,-74.00', end='2026-01-10')) == 120
+            assert history.rollups('monthly', prediction_type='monthly')[0]['total_power'] == 900.0
+            history.close()
+            
+            # Rollups from the older layout (no prediction type) are rebuilt on open
+            import sqlite3
+            conn = sqlite3.connect(os.path.join(tmp, 'history.db'))
+            conn.execute('PRAGMA user_version = 0')
+            conn.execute('DELETE FROM daily_rollups')
+            conn.commit()
+            conn.close()
+            reopened = PredictionHistory(os.path.join(tmp, 'history.db'))
+            assert reopened.rollups('monthly') == monthly
+            reopened.close()
+        print(f"✓ Prediction history stored and rolled up: {len(daily)} days, {len(monthly)} month")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Prediction history test failed: {e}")
+        return False
+
+def test_admission_control():
+    """Test load shedding and degraded mode of the admission controller"""
+    print("\nTesting Admission Control...")
+    
+    try:
+        from admission import AdmissionController, Overloaded
+        controller = AdmissionController('test', max_concurrent=1, max_queue=0, timeout=1.0, degrade_queue_depth=0)
+        
+        with controller.admit() as ticket:
+            assert ticket.degraded
+            try:
+                with controller.admit():
+                    pass
+                print("✗ Request beyond the queue limit was admitted")
+                return False
+            except Overloaded as e:
+                assert e.retry_after >= 1
+        
+        assert controller.stats()['rejected'] == 1 and controller.stats()['in_flight'] == 0
+        print(f"✓ Admission control shed excess load: {controller.stats()}")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Admission control test failed: {e}")
+        return False
+
+def test_load_harness():
+    """Test the stub upstream and request schedule of the load-test harness"""
+    print("\nTesting Load-Test Harness...")
+    
+    try:
+        import httpx
+        from loadtest import StubUpstream, build_schedule, find_free_port, DEFAULT_MIX
+        
+        schedule = build_schedule(rps=20, duration=5, mix=DEFAULT_MIX, seed=7)
+        assert schedule == build_schedule(rps=20, duration=5, mix=DEFAULT_MIX, seed=7)
+        
+        stub = StubUpstream(latency_ms=1, jitter_ms=0, error_rate=0.0)
+        port = find_free_port()
+        stub.start(port)
+        try:
+            response = httpx.get(f"http://127.0.0.1:{port}/data/2.5/forecast", params={'lat': 40.7, 'lon': -74.0})
+            assert response.status_code == 200 and len(response.json()['list']) == 40
+        finally:
+            stub.stop()
+        
+        # Injected latency and errors do not depend on request arrival order
+        calls = [('/data/2.5/weather', {'lat': str(i % 3), 'lon': '0'}) for i in range(30)]
+        first = StubUpstream(error_rate=0.3, seed=7)
+        second = StubUpstream(error_rate=0.3, seed=7)
+        forward, backward = {}, {}
+        for path, params in calls:
+            forward.setdefault(params['lat'], []).append(first._draw(path, params))
+        for path, params in reversed(calls):
+            backward.setdefault(params['lat'], []).append(second._draw(path, params))
+        assert forward == backward and any(fail for draws in forward.values() for _, fail in draws)
+        print(f"✓ Stub upstream served the forecast; schedule of {len(schedule)} requests is reproducible")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Load-test harness test failed: {e}")
+        return False
+
+def test_response_format():
+    """Test the columnar and float32 response encodings"""
+    print("\nTesting Response Formats...")
+    
+    try:
+        import base64
+        import json
+        import numpy as np
+        from response_format import columnarize, encode_response
+        
+        payload = {
+            'success': True,
+            'prediction': {
+                'total_power': 150.5,
+                'hourly_predictions': [{'hour': 0, 'power': 0.0}, {'hour': 12, 'power': 100.25}, {'hour': 18, 'power': 50.25}]
+            }
+        }
+        
+        columnar = columnarize(payload, 'columnar')
+        assert columnar['prediction']['hourly_predictions']['columns'] == {'hour': [0, 12, 18], 'power': [0.0, 100.25, 50.25]}
+        
+        packed = columnarize(payload, 'float32')['prediction']['hourly_predictions']['columns']['power']
+        power = np.frombuffer(base64.b64decode(packed['data']), dtype='<f4')
+        assert np.allclose(power, [0.0, 100.25, 50.25])
+        
+        body, headers = encode_response(payload, 'columnar', None)
+        assert json.loads(body)['format'] == 'columnar' and 'Content-Encoding' not in headers
+        print(f"✓ Columnar response encoded in {len(body)} bytes")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Response format test failed: {e}")
+        return False
+
+def test_hyperparameter_search():
+    """Test the parallel successive-halving search"""
+    print("\nTesting Hyperparameter Search...")
+    
+    try:
+        from solar_prediction import SolarPowerPredictor
+        from model_tuning import SuccessiveHalvingSearch, MODEL_TYPES
+        predictor = SolarPowerPredictor()
+        
+        df = predictor.generate_synthetic_data(n_samples=600)
+        search = SuccessiveHalvingSearch(
+            grids={'rf': {'n_estimators': [10, 20]}, 'gb': {'n_estimators': [20]}},
+            n_folds=2, eta=2, rungs=2, n_jobs=2
+        )
+        result = search.run(df[predictor.feature_columns].to_numpy(), df['solar_power'].to_numpy(), compare_sequential=True)
+        
+        assert result['name'] in MODEL_TYPES
+        assert len(search.history) == 3 + 1
+        print(f"✓ Search picked {result['name']} {result['params']}, speedup {result['speedup']:.2f}x")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Hyperparameter search test failed: {e}")
+        return False
+
 def test_weather_api():
     """Test the weather API module"""
     print("\nTesting Weather API...")
@@ -91,6 +572,17 @@ def test_weather_api():
         weather_data = weather.get_demo_weather_data(40.7128, -74.0060)
         print(f"✓ Weather data retrieved: {weather_data['temperature']}°C, {weather_data['humidity']}% humidity")
         
+        # Test the snapshot cache stays bounded and expires
+        weather.cache_size = 3
+        for lon in range(5):
+            weather.cache_weather_data(10.0, lon, weather_data)
+        assert list(weather.cache) == [(10.0, 2.0), (10.0, 3.0), (10.0, 4.0)]
+        
+        key = (10.0, 2.0)
+        weather.cache[key] = (weather.cache[key][0] - weather.cache_ttl - 1, weather_data)
+        assert weather.get_cached_weather_data(10.0, 2.0) is None and key not in weather.cache
+        print(f"✓ Weather cache bounded to {len(weather.cache)} entries")
+        
         return True
         
     except Exception as e:
@@ -117,8 +609,38 @@ def test_report_generator():
         }
         
         csv_path = generator.generate_csv_report(test_data)
+        import pandas as pd
+        assert pd.read_csv(csv_path)['Cumulative (Wh)'].tolist() == [0, 100, 150, 1000]
+        os.remove(csv_path)
         print(f"✓ CSV report generated: {csv_path}")
         
+        # Compact response bodies are accepted by the CSV report too
+        from response_format import columnarize_series
+        weekly = {'total_power': 70.0, 'daily_predictions': [{'day': d, 'power': 10.0} for d in range(1, 8)]}
+        compact = dict(weekly, daily_predictions=columnarize_series(weekly['daily_predictions'], 'float32'))
+        csv_path = generator.generate_csv_report(compact)
+        frame = pd.read_csv(csv_path)
+        assert frame['Day'].tolist()[-2:] == ['7', 'TOTAL'] and frame['Cumulative (Wh)'].iloc[6] == 70.0
+        os.remove(csv_path)
+        
+        # Test columnar exports
+        import pyarrow.parquet as pq
+        parquet_path = generator.generate_parquet_report(test_data)
+        table = pq.read_table(parquet_path)
+        assert table.column('cumulative').to_pylist() == [0, 100, 150]
+        os.remove(parquet_path)
+        print(f"✓ Parquet report generated with {table.num_rows} rows")
+        
+        # Test chunked multi-site PDF with cached charts
+        annual = {
+            'total_power': 8760.0,
+            'hourly_predictions': [{'hour': h, 'power': 1.0} for h in range(8760)]
+        }
+        pdf_path = generator.generate_multi_site_pdf_report({'Site A': annual, 'Site B': annual, 'Site C': test_data})
+        assert os.path.getsize(pdf_path) > 0 and len(generator.chart_cache) == 2
+        os.remove(pdf_path)
+        print("✓ Multi-site PDF report generated")
+        
         return True
         
     except Exception as e:
@@ -143,6 +665,50 @@ def main():
     if not test_solar_predictor():
         all_tests_passed = False
     
+    # Test incremental model updates
+    if not test_incremental_update():
+        all_tests_passed = False
+    
+    # Test backtesting
+    if not test_backtester():
+        all_tests_passed = False
+    
+    # Test forecast prediction
+    if not test_forecast_prediction():
+        all_tests_passed = False
+    
+    # Test model registry
+    if not test_model_registry():
+        all_tests_passed = False
+    
+    # Test ASGI server
+    if not test_asgi_server():
+        all_tests_passed = False
+    
+    # Test conditional caching
+    if not test_conditional_caching():
+        all_tests_passed = False
+    
+    # Test prediction history
+    if not test_prediction_history():
+        all_tests_passed = False
+    
+    # Test admission control
+    if not test_admission_control():
+        all_tests_passed = False
+    
+    # Test load-test harness
+    if not test_load_harness():
+        all_tests_passed = False
+    
+    # Test response formats
+    if not test_response_format():
+        all_tests_passed = False
+    
+    # Test hyperparameter search
+    if not test_hyperparameter_search():
+        all_tests_passed = False
+    
     # Test weather API
     if not test_weather_api():
         all_tests_passed = False
@@ -1,6 +1,12 @@
 import requests
+import asyncio
 import json
 import math
+import time
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
@@ -11,15 +17,93 @@ class WeatherDataProvider:
     def __init__(self):
         # Using OpenWeatherMap API (free tier)
         self.api_key = os.getenv('OPENWEATHER_API_KEY', 'demo_key')
-        self.base_url = 'https://api.openweathermap.org/data/2.5'
+        self.base_url = os.getenv('OPENWEATHER_BASE_URL', 'https://api.openweathermap.org/data/2.5')
         
         # Fallback to demo data if no API key
         self.use_demo_data = self.api_key == 'demo_key'
+        
+        # Recent snapshots keyed by rounded coordinates; OpenWeatherMap
+        # refreshes current conditions roughly every 10 minutes. Entries are
+        # kept in fetch order, dropped once older than the TTL, and the oldest
+        # are evicted beyond WEATHER_CACHE_SIZE locations.
+        self.cache_ttl = int(os.getenv('WEATHER_CACHE_TTL', 600))
+        self.cache_size = int(os.getenv('WEATHER_CACHE_SIZE', 4096))
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+    
+    def _cache_key(self, latitude, longitude):
+        return (round(float(latitude), 2), round(float(longitude), 2))
+    
+    def _purge_expired(self, now):
+        """Drop snapshots older than the TTL; the oldest are at the front"""
+        while self.cache:
+            fetched_at, _ = next(iter(self.cache.values()))
+            if now - fetched_at <= self.cache_ttl:
+                break
+            self.cache.popitem(last=False)
+    
+    def _cache_entry(self, latitude, longitude):
+        """(fetched_at, weather_data) of an unexpired snapshot, or None"""
+        with self.cache_lock:
+            self._purge_expired(time.time())
+            return self.cache.get(self._cache_key(latitude, longitude))
+    
+    def get_cached_weather_data(self, latitude, longitude, max_age=None):
+        """Return the cached snapshot for a location, or None if missing or older than max_age seconds"""
+        entry = self._cache_entry(latitude, longitude)
+        if entry is None:
+            return None
+        
+        fetched_at, weather_data = entry
+        if max_age is not None and time.time() - fetched_at > max_age:
+            return None
+        return weather_data
+    
+    def get_snapshot_time(self, latitude, longitude, served=None):
+        """When the cached snapshot for a location was fetched, or None if not cached.
+        
+        With ``served``, also None unless that weather data is the snapshot
+        itself (not demo data from a failed refresh, nor an older snapshot
+        replaced since it was served).
+        """
+        entry = self._cache_entry(latitude, longitude)
+        if entry is None or time.time() - entry[0] > self.cache_ttl:
+            return None
+        if served is not None and entry[1] is not served:
+            return None
+        return entry[0]
+    
+    def cache_weather_data(self, latitude, longitude, weather_data):
+        """Store a weather snapshot for a location"""
+        key = self._cache_key(latitude, longitude)
+        now = time.time()
+        with self.cache_lock:
+            self.cache.pop(key, None)
+            self.cache[key] = (now, weather_data)
+            self._purge_expired(now)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return weather_data
+    
+    def get_degraded_weather_data(self, latitude, longitude):
+        """Weather without any upstream call: the unexpired cached snapshot, else demo data"""
+        cached = self.get_cached_weather_data(latitude, longitude)
+        if cached is not None:
+            return cached
+        return self.get_demo_weather_data(latitude, longitude)
+    
+    def get_degraded_hourly_forecast(self, latitude, longitude, hours=120):
+        """Hourly forecast without any upstream call, built from demo data"""
+        return self.interpolate_hourly_forecast(self.generate_demo_forecast(n_entries=40), latitude, longitude, hours)
     
     def get_weather_data(self, latitude, longitude):
         """Get current weather data for the given coordinates"""
+        cached = self.get_cached_weather_data(latitude, longitude, self.cache_ttl)
+        if cached is not None:
+            return cached
+        
         if self.use_demo_data:
-            return self.get_demo_weather_data(latitude, longitude)
+            return self.cache_weather_data(latitude, longitude, self.get_demo_weather_data(latitude, longitude))
         
         try:
             # Get current weather
@@ -41,28 +125,142 @@ class WeatherDataProvider:
             response.raise_for_status()
             forecast_data = response.json()
             
-            # Extract relevant data
-            weather_data = {
-                'temperature': current_data['main']['temp'],
-                'humidity': current_data['main']['humidity'],
-                'wind_speed': current_data['wind']['speed'],
-                'cloud_cover': current_data['clouds']['all'],
-                'solar_irradiance': self.estimate_solar_irradiance(
-                    current_data['main']['temp'],
-                    current_data['clouds']['all'],
-                    latitude,
-                    datetime.now()
-                ),
-                'description': current_data['weather'][0]['description'],
-                'forecast': self.process_forecast_data(forecast_data)
+            weather_data = self.build_weather_data(current_data, forecast_data, latitude)
+            return self.cache_weather_data(latitude, longitude, weather_data)
+            
+        except Exception as e:
+            print(f"Error fetching weather data: {e}")
+            return self.get_demo_weather_data(latitude, longitude)
+    
+    async def get_weather_data_async(self, latitude, longitude, client):
+        """Non-blocking get_weather_data using a shared httpx.AsyncClient"""
+        cached = self.get_cached_weather_data(latitude, longitude, self.cache_ttl)
+        if cached is not None:
+            return cached
+        
+        if self.use_demo_data:
+            return self.cache_weather_data(latitude, longitude, self.get_demo_weather_data(latitude, longitude))
+        
+        try:
+            params = {
+                'lat': latitude,
+                'lon': longitude,
+                'appid': self.api_key,
+                'units': 'metric'
             }
             
-            return weather_data
+            # Current weather and forecast are fetched concurrently
+            current_response, forecast_response = await asyncio.gather(
+                client.get(f"{self.base_url}/weather", params=params, timeout=10),
+                client.get(f"{self.base_url}/forecast", params=params, timeout=10)
+            )
+            current_response.raise_for_status()
+            forecast_response.raise_for_status()
+            
+            weather_data = self.build_weather_data(current_response.json(), forecast_response.json(), latitude)
+            return self.cache_weather_data(latitude, longitude, weather_data)
             
         except Exception as e:
             print(f"Error fetching weather data: {e}")
             return self.get_demo_weather_data(latitude, longitude)
     
+    def build_weather_data(self, current_data, forecast_data, latitude):
+        """Extract the relevant fields from /weather and /forecast responses"""
+        return {
+            'temperature': current_data['main']['temp'],
+            'humidity': current_data['main']['humidity'],
+            'wind_speed': current_data['wind']['speed'],
+            'cloud_cover': current_data['clouds']['all'],
+            'solar_irradiance': self.estimate_solar_irradiance(
+                current_data['main']['temp'],
+                current_data['clouds']['all'],
+                latitude,
+                datetime.now()
+            ),
+            'description': current_data['weather'][0]['description'],
+            'forecast': self.process_forecast_data(forecast_data)
+        }
+    
+    def get_forecast_data(self, latitude, longitude):
+        """Get the full 5-day / 3-hour forecast (all 40 entries)"""
+        if self.use_demo_data:
+            return self.generate_demo_forecast(n_entries=40)
+        
+        try:
+            params = {
+                'lat': latitude,
+                'lon': longitude,
+                'appid': self.api_key,
+                'units': 'metric'
+            }
+            response = requests.get(f"{self.base_url}/forecast", params=params, timeout=10)
+            response.raise_for_status()
+            
+            return self.process_forecast_data(response.json(), limit=None)
+            
+        except Exception as e:
+            print(f"Error fetching forecast data: {e}")
+            return self.generate_demo_forecast(n_entries=40)
+    
+    async def get_forecast_data_async(self, latitude, longitude, client):
+        """Non-blocking get_forecast_data using a shared httpx.AsyncClient"""
+        if self.use_demo_data:
+            return self.generate_demo_forecast(n_entries=40)
+        
+        try:
+            params = {
+                'lat': latitude,
+                'lon': longitude,
+                'appid': self.api_key,
+                'units': 'metric'
+            }
+            response = await client.get(f"{self.base_url}/forecast", params=params, timeout=10)
+            response.raise_for_status()
+            
+            return self.process_forecast_data(response.json(), limit=None)
+            
+        except Exception as e:
+            print(f"Error fetching forecast data: {e}")
+            return self.generate_demo_forecast(n_entries=40)
+    
+    def get_hourly_forecast(self, latitude, longitude, hours=120):
+        """Get the 5-day forecast interpolated to hourly resolution"""
+        forecast = self.get_forecast_data(latitude, longitude)
+        return self.interpolate_hourly_forecast(forecast, latitude, longitude, hours)
+    
+    async def get_hourly_forecast_async(self, latitude, longitude, client, hours=120):
+        """Non-blocking get_hourly_forecast using a shared httpx.AsyncClient"""
+        forecast = await self.get_forecast_data_async(latitude, longitude, client)
+        return self.interpolate_hourly_forecast(forecast, latitude, longitude, hours)
+    
+    def interpolate_hourly_forecast(self, forecast, latitude, longitude, hours=120):
+        """Linearly interpolate 3-hourly forecast entries onto an hourly grid.
+        
+        Forecast times (``dt_txt``) are UTC. ``solar_time`` shifts them to local
+        solar time (longitude / 15 hours), which drives the sun geometry.
+        """
+        times = pd.to_datetime([item['datetime'] for item in forecast])
+        start = times[0].floor('h')
+        entry_hours = (times - start) / pd.Timedelta(hours=1)
+        grid = np.arange(hours)
+        
+        hourly = pd.DataFrame({'datetime': start + pd.to_timedelta(grid, unit='h')})
+        for column in ('temperature', 'humidity', 'wind_speed', 'cloud_cover'):
+            values = np.array([item[column] for item in forecast], dtype=float)
+            hourly[column] = np.interp(grid, entry_hours, values)
+        
+        hourly['solar_time'] = hourly['datetime'] + pd.to_timedelta(longitude / 15, unit='h')
+        solar_time = hourly['solar_time']
+        hourly['solar_irradiance'] = self.estimate_solar_irradiance_batch(
+            hourly['temperature'].to_numpy(),
+            hourly['cloud_cover'].to_numpy(),
+            latitude,
+            solar_time.dt.dayofyear.to_numpy(),
+            ((solar_time - solar_time.dt.normalize()) / pd.Timedelta(hours=1)).to_numpy()
+        )
+        
+        return hourly
+    
     def get_demo_weather_data(self, latitude, longitude):
         """Generate demo weather data for testing"""
         import random
@@ -128,11 +326,34 @@ class WeatherDataProvider:
         
         return max(0, irradiance)
     
-    def process_forecast_data(self, forecast_data):
-        """Process forecast data into a usable format"""
+    def estimate_solar_irradiance_batch(self, temperature, cloud_cover, latitude, day_of_year, hour):
+        """Vectorized version of estimate_solar_irradiance for arrays of hours"""
+        declination = 23.45 * np.sin(np.radians(360 * (284 + day_of_year) / 365))
+        
+        lat_rad = np.radians(latitude)
+        decl_rad = np.radians(declination)
+        hour_rad = np.radians(15 * (hour - 12))
+        
+        elevation = np.arcsin(
+            np.sin(decl_rad) * np.sin(lat_rad) +
+            np.cos(decl_rad) * np.cos(lat_rad) * np.cos(hour_rad)
+        )
+        
+        base_irradiance = np.where(elevation > 0, 1000 * np.sin(elevation), 0)
+        cloud_factor = 1 - (cloud_cover / 100) * 0.7
+        temp_factor = 1 - (temperature - 25) * 0.001
+        
+        return np.maximum(0, base_irradiance * cloud_factor * temp_factor)
+    
+    def process_forecast_data(self, forecast_data, limit=8):
+        """Process forecast data into a usable format.
+        
+        By default only the next 24 hours (8 three-hour entries) are kept;
+        pass ``limit=None`` to keep the whole 5-day feed.
+        """
         forecast = []
         
-        for item in forecast_data['list'][:8]:  # Next 24 hours (3-hour intervals)
+        for item in forecast_data['list'][:limit]:
             forecast.append({
                 'datetime': item['dt_txt'],
                 'temperature': item['main']['temp'],
@@ -144,16 +365,16 @@ class WeatherDataProvider:
         
         return forecast
     
-    def generate_demo_forecast(self):
+    def generate_demo_forecast(self, n_entries=8):
         """Generate demo forecast data"""
         forecast = []
         base_time = datetime.now()
         
-        for i in range(8):
+        for i in range(n_entries):
             forecast_time = base_time + timedelta(hours=i*3)
             forecast.append({
                 'datetime': forecast_time.strftime('%Y-%m-%d %H:%M:%S'),
-                'temperature': round(20 + i * 2 + (i % 3 - 1) * 3, 1),
+                'temperature': round(20 + (i % 8) * 2 + (i % 3 - 1) * 3, 1),
                 'humidity': round(50 + (i % 4) * 10, 1),
                 'wind_speed': round(5 + (i % 2) * 3, 1),
                 'cloud_cover': round(30 + (i % 3) * 20, 1),